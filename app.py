@@ -1,9 +1,7 @@
 import os
 import sys
-import io
 import re
 import cv2
-import base64
 import threading
 import time
 import numpy as np
@@ -17,15 +15,29 @@ if THIS_DIR not in sys.path:
 
 from config import (
     APP_NAME, JIS_TYPES, DIN_TYPES, MONTHS, MONTH_MAP,
-    PATTERNS, DB_FILE, IMAGE_DIR, EXCEL_DIR
+    PATTERNS, DB_FILE, IMAGE_DIR, EXCEL_DIR, OCR_BACKEND, STREAM_MAX_FPS, PREVIEW_QUALITY,
+    SERVER_MODE, SERVER_PORT
 )
-from database import setup_database, load_existing_data, delete_codes, insert_detection
+from database import (
+    setup_database, load_existing_data, load_since, get_last_id,
+    delete_codes, day_bounds, month_bounds
+)
+from persistence import get_writer
+from preview import PreviewChannel
+from stream import FrameHub
+from server import run_server
+from reaper import get_reaper
+from partition import start_rollover_job
+from stats import DETECTION_STATS
 from export import execute_export
+from matcher import reload_catalogs
 from utils import create_directories, get_available_cameras
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'qc_gs_battery_secret_2024'
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+preview = PreviewChannel(socketio)
+frame_hub = FrameHub()
 
 class AppState:
     def __init__(self):
@@ -37,17 +49,23 @@ class AppState:
         self.edge_mode = False
         self.split_mode = False
         self.available_cameras = []
-        self.last_frame_b64 = None
-        self.stream_lock = threading.Lock()
         self.export_in_progress = False
         self.export_cancelled = False
         self.qty_plan = 0
+        self.sync_lock = threading.Lock()
+        self.last_record_id = 0
 
 state = AppState()
-create_directories()
-setup_database()
 
 def _init_ocr_reader():
+    if OCR_BACKEND == "process":
+        from ocr_process import get_process_reader
+        reader = get_process_reader()
+        print(f"[OCR] Memuat model EasyOCR di {reader.processes} proses...")
+        reader.warmup()
+        print("[OCR] Model siap.")
+        return reader
+
     import easyocr, numpy as np
     try:
         import torch
@@ -71,12 +89,52 @@ def _ocr_loader_thread():
     state.ocr_reader = _init_ocr_reader()
     state.ocr_ready.set()
 
-_threading.Thread(target=_ocr_loader_thread, daemon=True).start()
+def _on_records_written(records):
+    #record yang baru di-commit writer dikirim ke semua klien sebagai delta
+    today = datetime.now().strftime("%Y-%m-%d")
+    records = [r for r in records if r['Time'].startswith(today)]
+    if not records:
+        return
+    with state.sync_lock:
+        since = state.last_record_id
+        state.last_record_id = max([since] + [r['ID'] for r in records])
+    socketio.emit('records_added', {
+        'since': since,
+        'records': _serialize_records(records),
+        'stats': _stats_payload(),
+    })
+
+def _stats_payload():
+    #ringkasan hari ini untuk footer web: total semua label dan label aktif
+    day = datetime.now().date()
+    return {
+        'day': DETECTION_STATS.summary(day),
+        'label': state.target_label,
+        'label_stats': DETECTION_STATS.summary(day, target_session=state.target_label),
+    }
+
+#pool OCR (ocr_process) membuat worker tanpa mengimpor modul ini; kalau tetap terimpor di proses anak
+#(mis. worker yang dibuat ulang), database, writer dan model OCR tidak disentuh di sana
+import multiprocessing as _mp
+if _mp.parent_process() is None:
+    create_directories()
+    setup_database()
+    state.last_record_id = get_last_id()
+    get_writer().add_listener(_on_records_written)
+    start_rollover_job()
+    get_reaper()
+    _threading.Thread(target=_ocr_loader_thread, daemon=True).start()
+
+def publish_preview_frame(frame):
+    try:
+        #JPEG di-encode oleh FrameHub/PreviewChannel hanya jika ada viewer, sekali per kualitas
+        seq = frame_hub.publish(frame)
+        preview.publish(frame, seq)
+    except Exception as e:
+        print(f"[frame error] {e}")
 
 def _init_detection_logic():
     from ocr import DetectionLogic
-    from PIL import Image
-
     class FakeSignal:
         def __init__(self, callback):
             self._cb = callback
@@ -86,24 +144,9 @@ def _init_detection_logic():
             except Exception as e:
                 print(f"[signal emit error] {e}")
 
-    def on_frame_update(pil_image):
-        try:
-            buf = io.BytesIO()
-            pil_image.save(buf, format='JPEG', quality=75)
-            b64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-            with state.stream_lock:
-                state.last_frame_b64 = b64
-            socketio.emit('frame', {'img': b64})
-        except Exception as e:
-            print(f"[frame error] {e}")
-
     def on_code_detected(message):
-        today = datetime.now().date()
-        records = load_existing_data(today)
-        socketio.emit('code_detected', {
-            'message': message,
-            'records': _serialize_records(records)
-        })
+        #record baru dikirim lewat 'records_added' setelah writer menyimpannya
+        socketio.emit('code_detected', {'message': message})
 
     def on_camera_status(message, is_active):
         socketio.emit('camera_status', {'message': message, 'active': is_active})
@@ -115,7 +158,7 @@ def _init_detection_logic():
         socketio.emit('ocr_text', {'texts': text_list})
 
     logic = DetectionLogic(
-        FakeSignal(on_frame_update),
+        FakeSignal(publish_preview_frame),
         FakeSignal(on_code_detected),
         FakeSignal(on_camera_status),
         FakeSignal(on_data_reset),
@@ -124,6 +167,15 @@ def _init_detection_logic():
     )
     return logic
 
+def _image_url(image_path):
+    #gambar disimpan di images/YYYY/MM/DD, URL memakai path relatif terhadap IMAGE_DIR
+    if not image_path:
+        return ''
+    rel_path = os.path.relpath(os.path.abspath(image_path), os.path.abspath(IMAGE_DIR))
+    if rel_path.startswith('..'):
+        rel_path = os.path.basename(image_path)
+    return '/api/image/' + rel_path.replace(os.sep, '/')
+
 def _serialize_records(records):
     result = []
     for r in records:
@@ -135,6 +187,7 @@ def _serialize_records(records):
             'status':  r.get('Status', 'OK'),
             'target':  r.get('TargetSession', ''),
             'imgPath': r.get('ImagePath', ''),
+            'imgUrl':  _image_url(r.get('ImagePath', '')),
         })
     return result
 
@@ -143,6 +196,14 @@ def api_ocr_ready():
     ready = state.ocr_ready.is_set() if hasattr(state, 'ocr_ready') else False
     return jsonify({'ready': ready})
 
+@app.route('/api/ocr/stats', methods=['GET'])
+def api_ocr_stats():
+    if not state.logic:
+        return jsonify({'running': False})
+    stats = state.logic.get_ocr_stats()
+    stats['running'] = state.is_running
+    return jsonify(stats)
+
 @app.route('/')
 def index():
     return render_template('index.html', app_name=APP_NAME)
@@ -250,8 +311,12 @@ def api_scan_file():
 @app.route('/api/data/today', methods=['GET'])
 def api_data_today():
     today = datetime.now().date()
-    records = load_existing_data(today)
-    return jsonify({'records': _serialize_records(records)})
+    since = request.args.get('since', type=int)
+    if since is not None:
+        records = load_since(today, since)
+    else:
+        records = load_existing_data(today)
+    return jsonify({'records': _serialize_records(records), 'since': since})
 
 @app.route('/api/data/delete', methods=['POST'])
 def api_data_delete():
@@ -262,28 +327,29 @@ def api_data_delete():
 
     ok = delete_codes(ids)
     if state.logic:
-        state.logic.detected_codes = [
-            r for r in state.logic.detected_codes if r['ID'] not in ids
-        ]
+        state.logic.discard_records(ids)
+    DETECTION_STATS.invalidate()
 
     if ok:
+        socketio.emit('records_deleted', {'ids': ids, 'stats': _stats_payload()})
         return jsonify({'ok': True, 'msg': f'{len(ids)} record dihapus'})
     else:
         return jsonify({'ok': False, 'msg': 'Gagal menghapus record'})
 
 @app.route('/api/data/stats', methods=['GET'])
 def api_data_stats():
-    today = datetime.now().date()
-    records = load_existing_data(today)
-    total  = len(records)
-    ok     = sum(1 for r in records if r.get('Status') == 'OK')
-    not_ok = sum(1 for r in records if r.get('Status') == 'Not OK')
-    return jsonify({'total': total, 'ok': ok, 'not_ok': not_ok})
+    preset = request.args.get('preset') or None
+    label = request.args.get('label') or None
+    counts = DETECTION_STATS.summary(datetime.now().date(), preset=preset, target_session=label)
+    return jsonify({'total': counts['total'], 'ok': counts['ok'], 'not_ok': counts['not_ok']})
 
 @app.route('/api/image/<path:filename>')
 def api_serve_image(filename):
-    img_path = os.path.join(IMAGE_DIR, filename)
-    if os.path.exists(img_path):
+    image_root = os.path.abspath(IMAGE_DIR)
+    img_path = os.path.abspath(os.path.join(image_root, filename))
+    if os.path.commonpath([image_root, img_path]) != image_root:
+        return jsonify({'error': 'Image not found'}), 404
+    if os.path.isfile(img_path):
         return send_file(img_path, mimetype='image/jpeg')
     return jsonify({'error': 'Image not found'}), 404
 
@@ -302,16 +368,21 @@ def api_export():
     end_date      = data.get('end_date', '')
 
     conditions = []
+    export_range = None
 
     if date_range == 'Today':
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        conditions.append(f"timestamp LIKE '{today_str}%'")
+        day_start, day_end = day_bounds(datetime.now().date())
+        conditions.append(f"timestamp >= '{day_start}' AND timestamp < '{day_end}'")
+        export_range = (day_start, day_end)
     elif date_range == 'Month' and month_name:
         month_num = MONTH_MAP.get(month_name, datetime.now().month)
-        month_str = f"{year_val}-{month_num:02d}"
-        conditions.append(f"timestamp LIKE '{month_str}%'")
+        year_num = int(year_val) if str(year_val).isdigit() else datetime.now().year
+        month_start, month_end = month_bounds(year_num, month_num)
+        conditions.append(f"timestamp >= '{month_start}' AND timestamp < '{month_end}'")
+        export_range = (month_start, month_end)
     elif date_range == 'CustomDate' and start_date and end_date:
         conditions.append(f"timestamp BETWEEN '{start_date} 00:00:00' AND '{end_date} 23:59:59'")
+        export_range = (f"{start_date} 00:00:00", f"{end_date} 23:59:59")
 
     actual_preset = preset_filter
     if preset_filter == 'Preset':
@@ -352,7 +423,8 @@ def api_export():
                 ),
                 cancel_flag=state,
                 qty_plan=state.qty_plan,
-                show_qty_plan=show_qty_plan
+                show_qty_plan=show_qty_plan,
+                date_range=export_range
             )
             if result == "NO_DATA":
                 socketio.emit('export_done', {'ok': False, 'no_data': True, 'msg': 'Gagal Export, Tidak ada data !'})
@@ -405,6 +477,15 @@ def api_labels():
         'months': MONTHS,
     })
 
+@app.route('/api/labels/reload', methods=['POST'])
+def api_labels_reload():
+    try:
+        reload_catalogs()
+    except Exception as e:
+        print(f"[labels] Error reload: {e}")
+        return jsonify({'ok': False, 'msg': f'Gagal memuat ulang label, label lama tetap dipakai: {e}'}), 500
+    return jsonify({'ok': True, 'jis': len(JIS_TYPES) - 1, 'din': len(DIN_TYPES) - 1})
+
 @app.route('/api/state', methods=['GET'])
 def api_state():
     return jsonify({
@@ -427,25 +508,85 @@ def api_set_qty_plan():
     except (ValueError, TypeError):
         return jsonify({'ok': False, 'msg': 'Nilai QTY Plan tidak valid'})
 
+@app.route('/api/stream.mjpg')
+def api_stream_mjpg():
+    if frame_hub.latest()[0] is None:
+        return jsonify({'error': 'Belum ada frame'}), 503
+    if not frame_hub.open_stream():
+        #semua slot stream terpakai: browser beralih ke polling /api/snapshot.jpg
+        response = jsonify({'error': 'Stream penuh', 'fallback': '/api/snapshot.jpg'})
+        response.headers['Retry-After'] = '15'
+        return response, 503
+    fps = request.args.get('fps', type=float) or STREAM_MAX_FPS
+    return Response(
+        frame_hub.mjpeg(fps),
+        mimetype=f'multipart/x-mixed-replace; boundary={FrameHub.BOUNDARY}',
+        headers={'Cache-Control': 'no-cache, no-store, must-revalidate', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/snapshot.jpg')
+def api_snapshot_jpg():
+    frame, seq, updated = frame_hub.latest()
+    if frame is None:
+        return jsonify({'error': 'Belum ada frame'}), 503
+
+    etag = f"frame-{frame_hub.epoch}-{seq}"
+    if request.if_none_match.contains(etag):
+        #frame belum berubah: 304 tanpa encode
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = Response(frame.jpeg(PREVIEW_QUALITY), mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(updated)
+    response.headers['Cache-Control'] = 'no-cache'
+    #If-None-Match sama dengan frame terakhir -> 304 tanpa body
+    return response.make_conditional(request)
+
+@app.route('/api/preview/stats', methods=['GET'])
+def api_preview_stats():
+    return jsonify({'clients': preview.stats(), 'mjpeg_streams': frame_hub.streams,
+                    'mjpeg_max_streams': frame_hub.max_streams})
+
 @socketio.on('connect')
 def on_connect():
+    preview.add(request.sid)
     today = datetime.now().date()
+    synced_id = state.last_record_id
     records = load_existing_data(today)
     emit('init_data', {
         'records': _serialize_records(records),
+        'last_id': max([synced_id] + [r['ID'] for r in records]),
         'running': state.is_running,
         'preset':  state.preset,
         'label':   state.target_label,
+        'preview': app.config.get('PREVIEW_TRANSPORT', 'socket'),
+        'stats':   _stats_payload(),
     })
 
 @socketio.on('disconnect')
 def on_disconnect():
-    pass
+    preview.remove(request.sid)
+
+@socketio.on('preview_config')
+def on_preview_config(data):
+    data = data or {}
+    try:
+        fps = float(data['fps']) if data.get('fps') else None
+        quality = int(data['quality']) if data.get('quality') else None
+    except (TypeError, ValueError):
+        return {'ok': False}
+    enabled = data.get('enabled')
+    return {'ok': preview.configure(request.sid, fps=fps, quality=quality,
+                                    enabled=None if enabled is None else bool(enabled))}
 
 if __name__ == '__main__':
+    _mp.freeze_support()
     print("=" * 30)
     print(f"         {APP_NAME} — KartonOCR")
     print("      Ctrl + C untuk Stop")
-    print(" Akses: http://localhost:5000")
+    print(f" Akses: http://localhost:{SERVER_PORT}")
     print("=" * 30)
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    #python app.py --production : server waitress, selain itu server Werkzeug seperti sebelumnya
+    run_server(app, socketio, mode="production" if "--production" in sys.argv else SERVER_MODE)
\ No newline at end of file
@@ -0,0 +1,187 @@
+import threading
+import cv2
+import numpy as np
+from config import (
+    FRAME_RING_SIZE, GATE_ENABLED, GATE_MOTION_THRESHOLD, GATE_BLUR_THRESHOLD,
+    GATE_MAX_IDLE, GATE_SAMPLE_SIZE
+)
+
+class FrameRingBuffer:
+    #slot kamera yang dialokasikan sekali, pembaca selalu mengambil frame terbaru
+
+    def __init__(self, size=FRAME_RING_SIZE):
+        self.size = max(2, int(size))
+        self._slots = None
+        self._latest_index = -1
+        self._cond = threading.Condition()
+        self.seq = 0
+        self.closed = False
+
+    def _allocate(self, frame):
+        self._slots = [np.empty_like(frame) for _ in range(self.size)]
+        self._latest_index = -1
+
+    def _next_slot(self):
+        #penulis tunggal: slot berikutnya tidak pernah sama dengan slot yang sedang dibaca
+        if self._slots is None:
+            return None
+        return self._slots[(self._latest_index + 1) % self.size]
+
+    def _publish(self, frame):
+        target = self._next_slot()
+
+        if target is None or target.shape != frame.shape or target.dtype != frame.dtype:
+            self._allocate(frame)
+            target = self._next_slot()
+
+        if frame is not target:
+            np.copyto(target, frame)
+
+        with self._cond:
+            self._latest_index = (self._latest_index + 1) % self.size
+            self.seq += 1
+            self._cond.notify_all()
+
+    def capture_from(self, cap):
+        slot = self._next_slot()
+        ret, frame = cap.read(slot) if slot is not None else cap.read()
+
+        if not ret or frame is None:
+            return False
+
+        self._publish(frame)
+        return True
+
+    def put(self, frame):
+        self._publish(frame)
+
+    def get_latest(self, after_seq=0, timeout=None, out=None):
+        with self._cond:
+            if self.seq <= after_seq and not self.closed:
+                self._cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout)
+
+            if self.seq <= after_seq or self._latest_index < 0:
+                return self.seq, None
+
+            latest = self._slots[self._latest_index]
+            if out is not None and out.shape == latest.shape and out.dtype == latest.dtype:
+                np.copyto(out, latest)
+                return self.seq, out
+
+            return self.seq, latest.copy()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class FrameGate:
+    #cek murah sebelum OCR: lewati frame yang tidak berubah atau terlalu blur
+
+    def __init__(self, motion_threshold=GATE_MOTION_THRESHOLD, blur_threshold=GATE_BLUR_THRESHOLD,
+                 max_idle=GATE_MAX_IDLE, sample_size=GATE_SAMPLE_SIZE):
+        self.motion_threshold = motion_threshold
+        self.blur_threshold = blur_threshold
+        self.max_idle = max_idle
+        self.sample_size = sample_size
+        self.enabled = GATE_ENABLED
+
+        self._reference = None
+        self._last_pass_time = 0.0
+
+        self.passed = 0
+        self.skipped_static = 0
+        self.skipped_blur = 0
+        self.last_motion = 0.0
+        self.last_sharpness = 0.0
+
+    def _sample(self, frame):
+        #area tengah persegi, sama dengan area yang dibaca OCR
+        h, w = frame.shape[:2]
+        min_dim = min(h, w)
+        start_x = (w - min_dim) // 2
+        start_y = (h - min_dim) // 2
+        crop = frame[start_y:start_y + min_dim, start_x:start_x + min_dim]
+
+        small = cv2.resize(crop, (self.sample_size, self.sample_size), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def _sharpness(self, gray):
+        #variansi Laplacian 4-tetangga
+        lap = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+               - 4.0 * gray[1:-1, 1:-1])
+        return float(lap.var())
+
+    def check(self, frame, now):
+        if not self.enabled:
+            self.passed += 1
+            return True
+
+        sample = self._sample(frame)
+
+        if self._reference is not None:
+            self.last_motion = float(np.abs(sample - self._reference).mean())
+            if self.last_motion < self.motion_threshold and now - self._last_pass_time < self.max_idle:
+                self.skipped_static += 1
+                return False
+
+        self.last_sharpness = self._sharpness(sample)
+        if self.last_sharpness < self.blur_threshold:
+            self.skipped_blur += 1
+            return False
+
+        self._reference = sample
+        self._last_pass_time = now
+        self.passed += 1
+        return True
+
+    def reset(self):
+        self._reference = None
+        self._last_pass_time = 0.0
+
+    def stats(self):
+        return {
+            'gate_enabled': self.enabled,
+            'gate_passed': self.passed,
+            'gate_skipped_static': self.skipped_static,
+            'gate_skipped_blur': self.skipped_blur,
+            'gate_last_motion': round(self.last_motion, 2),
+            'gate_last_sharpness': round(self.last_sharpness, 2),
+        }
+
+def resize_frame(frame, width, height):
+    #INTER_AREA untuk mengecilkan (lebih murah dan lebih halus dari LANCZOS), INTER_LINEAR untuk memperbesar
+    h, w = frame.shape[:2]
+    if (w, h) == (width, height):
+        #frame kamera bisa berupa slot ring buffer yang nanti ditimpa, jadi tetap dikembalikan buffer baru
+        return frame.copy()
+    interpolation = cv2.INTER_AREA if width <= w and height <= h else cv2.INTER_LINEAR
+    return cv2.resize(frame, (width, height), interpolation=interpolation)
+
+class PreviewFrame:
+    #frame preview yang sudah berukuran target, dipakai bersama oleh Qt dan web tanpa konversi ulang:
+    #rgb untuk QImage (zero-copy), JPEG di-encode hanya saat ada yang meminta, sekali per kualitas
+
+    def __init__(self, bgr):
+        self.bgr = np.ascontiguousarray(bgr)
+        self.rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        self.height, self.width = self.rgb.shape[:2]
+        self._jpeg = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_per_line(self):
+        return self.rgb.strides[0]
+
+    def jpeg(self, quality):
+        quality = int(quality)
+        with self._lock:
+            data = self._jpeg.get(quality)
+            if data is None:
+                ok, encoded = cv2.imencode('.jpg', self.bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ok:
+                    raise IOError("gagal encode preview")
+                data = self._jpeg[quality] = encoded.tobytes()
+            return data
@@ -14,13 +14,64 @@ IMAGE_DIR = "images"
 EXCEL_DIR = "file_excel"
 DB_FILE = "detection.db"
 TYPE_DB_FILE = "type.db"
+ARCHIVE_DIR = "archive"
+ARCHIVE_KEEP_MONTHS = 1
+ROLLOVER_INTERVAL = 6 * 3600
+DB_BUSY_TIMEOUT = 10.0
+DB_CACHE_SIZE_KB = 16384
+DB_SYNCHRONOUS = "NORMAL"
+DB_POOL_SIZE = 4
+WRITE_BATCH_SIZE = 32
+WRITE_FLUSH_INTERVAL = 0.25
+WRITE_ID_BLOCK = 64
+WRITE_FSYNC = True
+WRITE_MAX_RETRIES = 5
+WRITE_DEAD_LETTER_FILE = "failed_detections.jsonl"
+EXPORT_CHUNK_SIZE = 500
+REAPER_BATCH_SIZE = 200
+REAPER_RETRY_INTERVAL = 30.0
+REAPER_MAX_ATTEMPTS = 10
 
 CAMERA_WIDTH = 1280
 CAMERA_HEIGHT = 720
 TARGET_WIDTH = 640
 TARGET_HEIGHT = 640
 BUFFER_SIZE = 1
+FRAME_RING_SIZE = 3
 SCAN_INTERVAL = 1.0
+OCR_BACKEND = "thread"
+OCR_PROCESSES = 0
+OCR_WORKERS = 1
+OCR_QUEUE_SIZE = 1
+OCR_BATCH_STAGES = True
+#True: crop CLAHE baru dibaca jika grayscale <= 0.82 (hemat di CPU); False: kedua stage satu batch (GPU)
+OCR_STAGE_EARLY_EXIT = False
+ROI_PADDING = 0.6
+ROI_MIN_PADDING = 12
+ROI_MAX_MISSES = 3
+GATE_ENABLED = True
+GATE_MOTION_THRESHOLD = 2.0
+GATE_BLUR_THRESHOLD = 30.0
+GATE_MAX_IDLE = 10.0
+GATE_SAMPLE_SIZE = 240
+MATCH_CACHE_SIZE = 4096
+DEDUP_WINDOW = 5.0
+PREVIEW_FPS = 15
+PREVIEW_MAX_FPS = 30
+PREVIEW_QUALITY = 75
+PREVIEW_MIN_QUALITY = 35
+PREVIEW_ACK_TIMEOUT = 2.0
+STREAM_MAX_FPS = 15
+STREAM_KEEPALIVE = 5.0
+SERVER_MODE = "dev"
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 5000
+SERVER_THREADS = 48
+SERVER_CONNECTION_LIMIT = 200
+SERVER_CHANNEL_TIMEOUT = 120
+#tiap /api/stream.mjpg memegang satu thread waitress selama terbuka (ditambah satu long-poll Socket.IO per browser);
+#di atas batas ini browser memakai polling /api/snapshot.jpg supaya API dan export tetap punya thread
+STREAM_MAX_CLIENTS = SERVER_THREADS // 3
 MAX_CAMERAS = 5
 
 try:
@@ -42,7 +93,8 @@ PATTERNS = {
 ALLOWLIST_JIS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYLRS()'
 ALLOWLIST_DIN = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ '
 
-def _load_types_from_db(table_name):
+def _load_types_from_db(table_name, strict=False):
+    #strict: error diteruskan ke pemanggil (reload), bukan diganti katalog kosong
     result = ["Select Label . . ."]
     db_path = TYPE_DB_FILE
 
@@ -59,12 +111,22 @@ def _load_types_from_db(table_name):
         result.extend(row[0] for row in rows)
     except Exception as e:
         print(f"[config] WARNING: Gagal memuat data dari tabel '{table_name}' di '{db_path}': {e}")
+        if strict:
+            raise
 
     return result
 
 JIS_TYPES = _load_types_from_db("jis")
 DIN_TYPES = _load_types_from_db("din")
 
+def reload_types():
+    #isi list diganti di tempat agar modul yang sudah import tetap melihat data terbaru;
+    #kedua tabel dibaca dulu, kalau salah satu gagal katalog lama tetap dipakai
+    jis_types = _load_types_from_db("jis", strict=True)
+    din_types = _load_types_from_db("din", strict=True)
+    JIS_TYPES[:] = jis_types
+    DIN_TYPES[:] = din_types
+
 MONTHS = ["January", "February", "March", "April", "May", "June", 
         "July", "August", "September", "Oktober", "November", "Desember"]
 
@@ -0,0 +1,284 @@
+import re
+from matcher import DIN_MATCHER
+
+#huruf yang sering terbaca sebagai angka (dan sebaliknya) pada label aki
+_LETTER_TO_DIGIT = str.maketrans('OQILZSGB', '00112568')
+_DIGIT_TO_LETTER = {
+    '0': 'D', '1': 'I', '2': 'Z', '3': 'B',
+    '4': 'A', '5': 'S', '6': 'G', '8': 'B',
+}
+_ISS_NORMALIZE = str.maketrans('510', 'SIO')
+_JIS_MID_CHARS = frozenset('ABCDEFGH')
+
+_RE_SPACES = re.compile(r'\s+')
+_RE_LETTERS = re.compile(r'[A-Z]')
+_RE_NON_DIN = re.compile(r'[^A-Z0-9\s]')
+_RE_NON_JIS = re.compile(r'[^A-Z0-9()]')
+
+_RE_DIN_LN_LETTER = re.compile(r'LN([OQILZSGB])(?=\s|$|\d)')
+_RE_DIN_SPLIT_LN = re.compile(r'\bL\s+N\s*([0-6])')
+_RE_DIN_SPLIT_LBN = re.compile(r'\bL\s+B\s*N\b')
+_RE_DIN_REVERSE = re.compile(r'^([0-9A-Z]{2,5})\s*LN\s*([0-6])\s*$')
+_RE_DIN_REVERSE_MISREAD = re.compile(r'^([0-9A-Z]{2,5})\s*(?:1N|IN|LH|LM)\s*([0-6])\s*$')
+_RE_DIN_LNA_ISS = re.compile(r'^(LN[0-6])\s+([0-9A-Z]{2,5})([A-Z])\s+(ISS|I55|IS5|I5S|155|1SS)\s*$')
+_RE_DIN_LNA = re.compile(r'^(LN[0-6])\s+([0-9A-Z]{2,5})([A-Z])\s*$')
+_RE_DIN_LBN_DIGIT = re.compile(r'^(LBN)(\d)')
+_RE_DIN_LN_DIGIT = re.compile(r'^(LN[0-6])(\d)')
+_RE_DIN_LN_ANY_DIGIT = re.compile(r'^(LN\d)(\d)')
+_RE_DIN_ISS_SPACED = re.compile(r'([A-Z0-9])\s*(ISS)$')
+_RE_DIN_ISS = re.compile(r'([A-Z0-9])(ISS)$')
+
+_RE_NORM_REVERSE = re.compile(r'^(\d+[A-Z]?)(LN\d)$')
+_RE_NORM_LBN = re.compile(r'^(LBN)(\d)$')
+_RE_NORM_LN = re.compile(r'^(LN\d)$')
+_RE_NORM_LN_ISS = re.compile(r'^(LN\d)(\d+)([A-Z])(ISS)$')
+_RE_NORM_LN_SUFFIX = re.compile(r'^(LN\d)(\d+)([A-Z])$')
+_RE_NORM_LN_NUMBER = re.compile(r'^(LN\d)(\d+)$')
+
+_RE_JIS_S_DIGIT = re.compile(r'\(5\)')
+_RE_JIS_S_OPEN = re.compile(r'5\)')
+_RE_JIS_S_CLOSE = re.compile(r'\([S5](?!\))')
+_RE_JIS_STRUCTURE = re.compile(r'^(\d{2,3})([A-Z0-9])(\d{2,3})([LR])?(\(S\))?$')
+_RE_JIS_LOOSE = re.compile(r'(\d+|[A-Z]+)(\d+|[A-Z])(\d+|[A-Z]+)([L|R|1|0|4|D|I]?)(\(S\)|5\)|S)?$')
+
+_RE_JIS_CODE = re.compile(r'^\d{2,3}[A-H]\d{2,3}[LR]?(?:\(S\))?$')
+_RE_DIN_CODE = re.compile(
+    r'^(?:LBN\d|LN[0-6]|LN[0-6]\d{2,5}[A-Z]?|LN[0-6]\d{2,5}[A-Z]ISS|\d{2,5}LN[0-6])$'
+)
+
+#tabel koreksi untuk fix_common_ocr_errors_jis
+_JIS_CHAR_TO_DIGIT = str.maketrans({
+    "O": "0", "Q": "0", "D": "0", "U": "0", "C": "0",  #mirip angka 0
+    "I": "1", "L": "1", "J": "1",                      #mirip angka 1
+    "Z": "2", "E": "3", "A": "4", "H": "4",            #mirip angka 2,3,4
+    "S": "5", "G": "6", "T": "7", "Y": "7",            #mirip angka 5,6,7
+    "B": "8", "P": "9", "R": "9"                       #mirip angka 8,9
+})
+_JIS_DIGIT_TO_CHAR = {
+    "0": "D", "1": "L", "2": "Z", "3": "B", "4": "A", "5": "S",
+    "6": "G", "7": "T", "8": "B", "9": "R"
+}
+_JIS_TYPE_FIX = {
+    'O': 'D', 'Q': 'D', 'G': 'D', '0': 'D', 'U': 'D', 'C': 'D',
+    '8': 'B', '3': 'B',
+    '4': 'A',
+}
+_JIS_TERMINAL_FIX = {
+    '1': 'L', 'I': 'L', 'J': 'L', '4': 'L',  #karakter mirip L
+    '0': 'R', 'Q': 'R', 'D': 'R', 'O': 'R',  #karakter mirip R
+}
+
+def _fix_reversed_number(raw_num):
+    corrected_num = raw_num.translate(_LETTER_TO_DIGIT)
+    digits_only = _RE_LETTERS.sub('', corrected_num)
+    return digits_only if len(digits_only) >= 2 else corrected_num
+
+def _fix_din_prefix(token):
+    #token pertama: L, lalu B/N, lalu angka seri LN atau N dari LBN
+    first = 'L' if token[0] in '1Il' else token[0]
+    if len(token) == 1:
+        return first
+
+    second = token[1]
+    if second == '8':
+        second = 'B'
+    elif second in 'HM':
+        second = 'N'
+    head = first + second
+    if len(token) == 2:
+        return head
+
+    third = token[2]
+    if head == 'LB':
+        third = 'N' if third in 'HM' else third
+    else:
+        third = third.translate(_LETTER_TO_DIGIT)
+    return head + third + token[3:]
+
+def _correct_din_tokens(text):
+    tokens = text.split()
+    if not tokens:
+        return text
+
+    corrected_tokens = []
+    for i, token in enumerate(tokens):
+        if i == 0:
+            corrected_tokens.append(_fix_din_prefix(token))
+        elif i == 1:
+            #kapasitas berupa angka, huruf terakhir adalah suffix
+            corrected_tokens.append(token[:-1].translate(_LETTER_TO_DIGIT) + token[-1])
+        elif i == 2:
+            corrected_tokens.append('ISS' if token.translate(_ISS_NORMALIZE) == 'ISS' else token)
+        else:
+            corrected_tokens.append(token)
+
+    return ' '.join(corrected_tokens)
+
+def correct_din_structure(text):
+    text = text.strip().upper()
+    text = _RE_NON_DIN.sub('', text)
+    text = _RE_SPACES.sub(' ', text).strip()
+
+    text = _RE_DIN_LN_LETTER.sub(lambda m: 'LN' + m.group(1).translate(_LETTER_TO_DIGIT), text)
+    text = _RE_DIN_SPLIT_LN.sub(r'LN\1', text)
+    text = _RE_DIN_SPLIT_LBN.sub('LBN', text)
+    text = _RE_SPACES.sub(' ', text).strip()
+
+    m_rev = _RE_DIN_REVERSE.match(text) or _RE_DIN_REVERSE_MISREAD.match(text)
+    if m_rev:
+        return f"{_fix_reversed_number(m_rev.group(1))}LN{m_rev.group(2)}"
+
+    m_lna_iss = _RE_DIN_LNA_ISS.match(text)
+    if m_lna_iss:
+        corrected_cap = m_lna_iss.group(2).translate(_LETTER_TO_DIGIT)
+        return f"{m_lna_iss.group(1)} {corrected_cap}{m_lna_iss.group(3)} ISS"
+
+    m_lna = _RE_DIN_LNA.match(text)
+    if m_lna:
+        corrected_cap = m_lna.group(2).translate(_LETTER_TO_DIGIT)
+        return f"{m_lna.group(1)} {corrected_cap}{m_lna.group(3)}"
+
+    text = _RE_DIN_LBN_DIGIT.sub(r'\1 \2', text)
+    text = _RE_DIN_LN_DIGIT.sub(r'\1 \2', text)
+    text = _RE_DIN_ISS_SPACED.sub(r'\1 \2', text)
+    text = _RE_SPACES.sub(' ', text).strip()
+
+    return _correct_din_tokens(text)
+
+def normalize_din_code(code):
+    code = code.strip().upper()
+    code_no_space = _RE_SPACES.sub('', code)
+
+    if _RE_NORM_REVERSE.match(code_no_space):
+        return code_no_space
+    match = _RE_NORM_LBN.match(code_no_space)
+    if match:
+        return f"{match.group(1)} {match.group(2)}"
+    match = _RE_NORM_LN.match(code_no_space)
+    if match:
+        return match.group(1)
+    match = _RE_NORM_LN_ISS.match(code_no_space)
+    if match:
+        return f"{match.group(1)} {match.group(2)}{match.group(3)} {match.group(4)}"
+    match = _RE_NORM_LN_SUFFIX.match(code_no_space)
+    if match:
+        return f"{match.group(1)} {match.group(2)}{match.group(3)}"
+    match = _RE_NORM_LN_NUMBER.match(code_no_space)
+    if match:
+        return f"{match.group(1)} {match.group(2)}"
+
+    code_spaced = _RE_SPACES.sub(' ', code).strip()
+    return _RE_DIN_ISS.sub(r'\1 \2', code_spaced)
+
+def _split_jis_mid(main_text, terminal, option):
+    #kode JIS: kapasitas (2-3 digit), huruf tengah A-H, ukuran (2-3 digit)
+    for mid_pos in (2, 3):
+        if mid_pos >= len(main_text):
+            continue
+
+        potential_mid = main_text[mid_pos]
+        if potential_mid in _JIS_MID_CHARS:
+            mid_char = potential_mid
+        elif potential_mid.isdigit():
+            mid_char = _DIGIT_TO_LETTER.get(potential_mid, 'D')
+            if mid_char not in _JIS_MID_CHARS:
+                continue
+        else:
+            continue
+
+        cap_corrected = main_text[:mid_pos].translate(_LETTER_TO_DIGIT)
+        size_corrected = main_text[mid_pos + 1:].translate(_LETTER_TO_DIGIT)
+
+        if cap_corrected.isdigit() and size_corrected.isdigit():
+            return f'{cap_corrected}{mid_char}{size_corrected}{terminal}{option}'
+        return None
+
+    return None
+
+def correct_jis_structure(text):
+    text = text.strip().upper().replace(' ', '')
+
+    text = _RE_JIS_S_DIGIT.sub('(S)', text)
+    text = _RE_JIS_S_OPEN.sub('(S)', text)
+    text = _RE_JIS_S_CLOSE.sub('(S)', text)
+
+    option = ''
+    main_text = text
+    if main_text.endswith('(S)'):
+        option = '(S)'
+        main_text = main_text[:-3]
+
+    terminal = ''
+    if main_text and main_text[-1] in 'LR':
+        terminal = main_text[-1]
+        main_text = main_text[:-1]
+
+    if len(main_text) >= 5:
+        corrected = _split_jis_mid(main_text, terminal, option)
+        if corrected:
+            return corrected
+
+    match = _RE_JIS_STRUCTURE.match(text)
+    if match:
+        capacity, middle_char, size = match.group(1), match.group(2), match.group(3)
+        terminal = match.group(4) or ''
+        option = match.group(5) or ''
+
+        if middle_char.isdigit():
+            corrected_letter = _DIGIT_TO_LETTER.get(middle_char, 'D')
+            if corrected_letter in _JIS_MID_CHARS:
+                middle_char = corrected_letter
+
+        return f"{capacity}{middle_char}{size}{terminal}{option}"
+
+    return text
+
+def correct(preset, text):
+    if preset == "DIN":
+        return correct_din_structure(text)
+    return correct_jis_structure(text)
+
+def detect_code_type(code):
+    code_normalized = code.replace(' ', '').upper()
+
+    if _RE_JIS_CODE.match(code_normalized):
+        return "JIS"
+
+    if DIN_MATCHER.contains(code_normalized) or _RE_DIN_CODE.match(code_normalized):
+        return "DIN"
+
+    return None
+
+def fix_common_ocr_errors_jis(text):
+    text = text.strip().upper()
+    text = _RE_NON_JIS.sub('', text)
+
+    match = _RE_JIS_LOOSE.search(text)
+    if match:
+        capacity, type_char, size, terminal, option = match.groups()
+
+        new_capacity = capacity.translate(_JIS_CHAR_TO_DIGIT)
+        new_type = _JIS_DIGIT_TO_CHAR.get(type_char, type_char) if type_char.isdigit() else type_char
+        new_type = _JIS_TYPE_FIX.get(new_type, new_type)
+        new_size = size.translate(_JIS_CHAR_TO_DIGIT)
+
+        terminal = _JIS_TERMINAL_FIX.get(terminal, terminal)
+        option = '(S)' if option else ''
+
+        return f"{new_capacity}{new_type}{new_size}{terminal}{option}".strip().upper()
+
+    text = text.translate(_JIS_CHAR_TO_DIGIT)
+    text = text.replace('5)', '(S)').replace('(5)', '(S)')
+    return text.strip().upper()
+
+def fix_common_ocr_errors_din(text):
+    text = text.strip().upper()
+    text = _RE_NON_DIN.sub('', text)
+    text = _RE_SPACES.sub(' ', text).strip()
+
+    text = _RE_DIN_LBN_DIGIT.sub(r'\1 \2', text)
+    text = _RE_DIN_LN_ANY_DIGIT.sub(r'\1 \2', text)
+    text = _RE_DIN_ISS.sub(r'\1 \2', text)
+    text = _RE_SPACES.sub(' ', text).strip()
+
+    return _correct_din_tokens(text)
@@ -1,160 +1,358 @@
 import sqlite3
-from datetime import datetime
-from config import DB_FILE
+import threading
+import atexit
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from config import DB_FILE, DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB, DB_SYNCHRONOUS, DB_POOL_SIZE
 
-def setup_database():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='detected_codes'")
-    table_exists = cursor.fetchone() is not None
+def open_connection(db_file=None):
+    conn = sqlite3.connect(db_file or DB_FILE, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+    #WAL: insert tidak memblokir pembaca (UI, Flask, export)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+    return conn
 
-    if not table_exists:
-        cursor.execute('''CREATE TABLE detected_codes (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            timestamp TEXT,
-                            code TEXT,
-                            preset TEXT,
-                            image_path TEXT,
-                            status TEXT,
-                            target_session TEXT
-                        )''')
-    else:
-        cursor.execute("PRAGMA table_info(detected_codes)")
-        columns = [column[1] for column in cursor.fetchall()]
+class ConnectionPool:
+    #koneksi SQLite yang dipakai ulang antar thread, satu koneksi hanya dipegang satu thread dalam satu waktu
+
+    def __init__(self, db_file, max_idle=DB_POOL_SIZE):
+        self.db_file = db_file
+        self.max_idle = max(1, int(max_idle))
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = False
+
+    def _connect(self):
+        conn = open_connection(self.db_file)
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        with self._lock:
+            if not self.closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
 
-        if 'status' not in columns:
+    def close(self):
+        with self._lock:
+            self.closed = True
+            idle = self._idle
+            self._idle = []
+        for conn in idle:
             try:
-                cursor.execute("ALTER TABLE detected_codes ADD COLUMN status TEXT DEFAULT 'OK'")
-                cursor.execute("UPDATE detected_codes SET status = 'OK' WHERE status IS NULL")
-            except Exception as e:
+                conn.close()
+            except sqlite3.Error:
                 pass
 
-        if 'target_session' not in columns:
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+def _get_pool(db_file):
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None or pool.closed:
+            pool = ConnectionPool(db_file)
+            _pools[db_file] = pool
+        return pool
+
+@contextmanager
+def db_connection(db_file=None):
+    if db_file is None:
+        db_file = DB_FILE
+
+    held = getattr(_local, 'held', None)
+    if held is None:
+        held = _local.held = {}
+
+    #pemanggilan bertingkat di thread yang sama memakai koneksi yang sama
+    if db_file in held:
+        yield held[db_file]
+        return
+
+    pool = _get_pool(db_file)
+    conn = pool.acquire()
+    held[db_file] = conn
+    try:
+        yield conn
+    finally:
+        del held[db_file]
+        pool.release(conn)
+
+def close_connections():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+atexit.register(close_connections)
+
+_pending_writes_hook = None
+
+def set_pending_writes_hook(hook):
+    #dipanggil sebelum membaca/menghapus agar deteksi yang masih antri sudah tersimpan
+    global _pending_writes_hook
+    _pending_writes_hook = hook
+
+def flush_pending_writes():
+    hook = _pending_writes_hook
+    if hook is not None:
+        hook()
+
+_tombstone_hook = None
+
+def set_tombstone_hook(hook):
+    #dipanggil setelah delete_codes commit, untuk membangunkan penghapus file gambar
+    global _tombstone_hook
+    _tombstone_hook = hook
+
+def _advance_sequence(cursor, count):
+    #naikkan sqlite_sequence sekaligus, id di rentang ini tidak akan dipakai AUTOINCREMENT
+    row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'detected_codes'").fetchone()
+    max_id = cursor.execute("SELECT MAX(id) FROM detected_codes").fetchone()[0] or 0
+    start = max(row[0] if row else 0, max_id)
+    end = start + count
+
+    if row:
+        cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'detected_codes'", (end,))
+    else:
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('detected_codes', ?)", (end,))
+    return start + 1, end
+
+def reserve_ids(conn, count):
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        first_id, last_id = _advance_sequence(cursor, count)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return first_id, last_id
+
+#versi skema detected_codes; naikkan dan tambah langkah di _migrate setiap ada perubahan kolom
+SCHEMA_VERSION = 2
+
+def _migrate(cursor, version):
+    #dijalankan sekali saat setup_database untuk database lama, setelah itu pembaca tidak perlu cek kolom
+    cursor.execute("PRAGMA table_info(detected_codes)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if version < 1 and 'status' not in columns:
+        cursor.execute("ALTER TABLE detected_codes ADD COLUMN status TEXT DEFAULT 'OK'")
+    if version < 1:
+        cursor.execute("UPDATE detected_codes SET status = 'OK' WHERE status IS NULL")
+
+    if version < 2 and 'target_session' not in columns:
+        cursor.execute("ALTER TABLE detected_codes ADD COLUMN target_session TEXT")
+    if version < 2:
+        cursor.execute("UPDATE detected_codes SET target_session = code WHERE target_session IS NULL")
+
+def setup_database():
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='detected_codes'")
+        table_exists = cursor.fetchone() is not None
+
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        row = cursor.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        version = row[0] if row and row[0] is not None else 0
+
+        if not table_exists:
+            cursor.execute('''CREATE TABLE detected_codes (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                timestamp TEXT,
+                                code TEXT,
+                                preset TEXT,
+                                image_path TEXT,
+                                status TEXT,
+                                target_session TEXT
+                            )''')
+            version = SCHEMA_VERSION
+        elif version < SCHEMA_VERSION:
             try:
-                cursor.execute("ALTER TABLE detected_codes ADD COLUMN target_session TEXT")
-                cursor.execute("UPDATE detected_codes SET target_session = code WHERE target_session IS NULL")
+                _migrate(cursor, version)
+                version = SCHEMA_VERSION
             except Exception as e:
-                pass
+                conn.rollback()
+                print(f"Error migrating database: {e}")
+                raise
+
+        cursor.execute("DELETE FROM schema_version")
+        cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+
+        #file gambar yang barisnya sudah dihapus, dibersihkan oleh reaper di background
+        cursor.execute('''CREATE TABLE IF NOT EXISTS image_tombstones (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            image_path TEXT NOT NULL,
+                            attempts INTEGER NOT NULL DEFAULT 0,
+                            last_error TEXT
+                        )''')
+
+        #index untuk query rentang tanggal dan filter export per preset/label
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_detected_codes_timestamp ON detected_codes (timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_detected_codes_preset_session ON detected_codes (preset, target_session, timestamp)")
+
+        conn.commit()
+
+def day_bounds(day):
+    #batas [awal, akhir) dalam format kolom timestamp, agar query bisa memakai index
+    return day.strftime("%Y-%m-%d"), (day + timedelta(days=1)).strftime("%Y-%m-%d")
 
-    conn.commit()
-    conn.close()
+def month_bounds(year, month):
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+#kolom lengkap dijamin oleh migrasi di setup_database
+RECORD_COLUMNS = "id, timestamp, code, preset, image_path, COALESCE(status, 'OK'), COALESCE(target_session, code)"
+
+def _fetch_records(conn, where_sql, params):
+    rows = conn.execute(f"SELECT {RECORD_COLUMNS} FROM detected_codes WHERE {where_sql}", params).fetchall()
+    return [{
+        'ID': row[0],
+        'Time': row[1],
+        'Code': row[2],
+        'Type': row[3],
+        'ImagePath': row[4],
+        'Status': row[5],
+        'TargetSession': row[6]
+    } for row in rows]
 
 def load_existing_data(current_date):
-    detected_codes = []
-    today_date_str = current_date.strftime("%Y-%m-%d")
+    flush_pending_writes()
+    day_start, day_end = day_bounds(current_date)
 
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            return _fetch_records(conn, "timestamp >= ? AND timestamp < ? ORDER BY timestamp ASC", (day_start, day_end))
+
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return []
 
-        cursor.execute("PRAGMA table_info(detected_codes)")
-        columns = [column[1] for column in cursor.fetchall()]
-        has_status = 'status' in columns
-        has_target_session = 'target_session' in columns
-
-        if has_status and has_target_session:
-            cursor.execute(f"SELECT id, timestamp, code, preset, image_path, status, target_session FROM detected_codes WHERE timestamp LIKE '{today_date_str}%' ORDER BY timestamp ASC")
-            for row in cursor.fetchall():
-                detected_codes.append({
-                    'ID': row[0],
-                    'Time': row[1],
-                    'Code': row[2],
-                    'Type': row[3],
-                    'ImagePath': row[4],
-                    'Status': row[5] if row[5] else 'OK',
-                    'TargetSession': row[6] if row[6] else row[2]
-                })
-        elif has_status:
-            cursor.execute(f"SELECT id, timestamp, code, preset, image_path, status FROM detected_codes WHERE timestamp LIKE '{today_date_str}%' ORDER BY timestamp ASC")
-            for row in cursor.fetchall():
-                detected_codes.append({
-                    'ID': row[0],
-                    'Time': row[1],
-                    'Code': row[2],
-                    'Type': row[3],
-                    'ImagePath': row[4],
-                    'Status': row[5] if row[5] else 'OK',
-                    'TargetSession': row[2]
-                })
-        else:
-            cursor.execute(f"SELECT id, timestamp, code, preset, image_path FROM detected_codes WHERE timestamp LIKE '{today_date_str}%' ORDER BY timestamp ASC")
-            for row in cursor.fetchall():
-                detected_codes.append({
-                    'ID': row[0],
-                    'Time': row[1],
-                    'Code': row[2],
-                    'Type': row[3],
-                    'ImagePath': row[4],
-                    'Status': 'OK',
-                    'TargetSession': row[2]
-                })
+def load_since(current_date, last_id):
+    #hanya record hari ini yang lebih baru dari last_id, untuk sinkronisasi bertahap
+    flush_pending_writes()
+    day_start, day_end = day_bounds(current_date)
 
-        conn.close()
-        return detected_codes
+    try:
+        with db_connection() as conn:
+            return _fetch_records(conn, "id > ? AND timestamp >= ? AND timestamp < ? ORDER BY id ASC", (int(last_id or 0), day_start, day_end))
 
     except Exception as e:
         print(f"Error loading data: {e}")
-        return detected_codes
-
-def delete_codes(record_ids):
-    if not record_ids:
-        return False
+        return []
 
+def get_last_id():
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            row = conn.execute("SELECT MAX(id) FROM detected_codes").fetchone()
+        return row[0] or 0
 
-        placeholders = ','.join('?' for _ in record_ids)
+    except Exception as e:
+        print(f"Error getting last id: {e}")
+        return 0
 
-        cursor.execute(f"SELECT image_path FROM detected_codes WHERE id IN ({placeholders})", record_ids)
-        image_paths = cursor.fetchall()
+#batas aman jumlah parameter per statement untuk SQLite lama
+_DELETE_CHUNK = 500
 
-        cursor.execute(f"DELETE FROM detected_codes WHERE id IN ({placeholders})", record_ids)
-        conn.commit()
-        conn.close()
+def delete_codes(record_ids):
+    #hapus baris dan catat file gambarnya di image_tombstones dalam satu transaksi,
+    #file dihapus belakangan oleh reaper sehingga request langsung selesai
+    if not record_ids:
+        return False
 
-        import os
+    flush_pending_writes()
 
-        for path_tuple in image_paths:
-            image_path = path_tuple[0]
-            if image_path and os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except Exception as file_e:
-                    print(f"Warning: Gagal menghapus file gambar {image_path}: {file_e}")
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for i in range(0, len(record_ids), _DELETE_CHUNK):
+                    chunk = list(record_ids[i:i + _DELETE_CHUNK])
+                    placeholders = ','.join('?' for _ in chunk)
+                    cursor.execute(
+                        f"INSERT INTO image_tombstones (image_path) SELECT image_path FROM detected_codes "
+                        f"WHERE id IN ({placeholders}) AND image_path IS NOT NULL AND image_path != ''",
+                        chunk
+                    )
+                    cursor.execute(f"DELETE FROM detected_codes WHERE id IN ({placeholders})", chunk)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
+        hook = _tombstone_hook
+        if hook is not None:
+            hook()
         return True
 
     except Exception as e:
         print(f"Error deleting data: {e}")
         return False
 
-def insert_detection(timestamp, code, preset, image_path, status, target_session):
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+def insert_records(conn, records):
+    #record tanpa 'ID' diberi id berurutan, semua baris masuk dalam satu transaksi; error diteruskan ke pemanggil.
+    #'ID' baru ditulis ke dict pemanggil setelah COMMIT berhasil, rollback tidak meninggalkan id palsu
+    if not records:
+        return None
 
-        cursor.execute("INSERT INTO detected_codes (timestamp, code, preset, image_path, status, target_session) VALUES (?, ?, ?, ?, ?, ?)",
-                    (timestamp, code, preset, image_path, status, target_session))
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        ids = [rec.get('ID') for rec in records]
+        missing = ids.count(None)
+        if missing:
+            next_id, _ = _advance_sequence(cursor, missing)
+            for i, record_id in enumerate(ids):
+                if record_id is None:
+                    ids[i] = next_id
+                    next_id += 1
 
-        new_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO detected_codes (id, timestamp, code, preset, image_path, status, target_session) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(record_id, rec['Time'], rec['Code'], rec['Type'], rec['ImagePath'], rec['Status'], rec['TargetSession'])
+             for record_id, rec in zip(ids, records)]
+        )
         conn.commit()
-        conn.close()
-        return new_id
+    except Exception:
+        conn.rollback()
+        raise
 
-    except Exception as e:
-        print(f"Error inserting detection: {e}")
-        return None
+    for record_id, rec in zip(ids, records):
+        rec['ID'] = record_id
+    return min(ids), max(ids)
 
 def get_detection_count(db_file=None):
     if db_file is None:
         db_file = DB_FILE
+        flush_pending_writes()
     try:
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM detected_codes")
-        count = cursor.fetchone()[0]
-        conn.close()
+        with db_connection(db_file) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM detected_codes")
+            count = cursor.fetchone()[0]
         return count
 
     except Exception as e:
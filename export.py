@@ -1,12 +1,66 @@
 import os
-import sqlite3
-import pandas as pd
+import heapq
 import tempfile
+import xlsxwriter
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
-from config import DB_FILE, Resampling
+from config import Resampling, EXPORT_CHUNK_SIZE
+from database import open_connection, flush_pending_writes
+from partition import archives_for_range, open_archive
+
+_EXPORT_COLUMNS = "timestamp, code, preset, image_path, COALESCE(status, 'OK'), COALESCE(target_session, code)"
+
+def _open_snapshots(date_range):
+    #satu transaksi baca per database: selama export berjalan semua query melihat snapshot WAL yang sama,
+    #insert dari kamera tetap jalan dan tidak ikut terbaca
+    start_ts, end_ts = date_range if date_range else (None, None)
+    sources = [open_archive(path) for path in archives_for_range(start_ts, end_ts)]
+    sources.append(open_connection())
+    for conn in sources:
+        conn.isolation_level = None
+        conn.execute("BEGIN")
+    return sources
+
+def _close_snapshots(sources):
+    for conn in sources:
+        try:
+            conn.execute("COMMIT")
+        except Exception:
+            pass
+        conn.close()
+
+def _summarize(sources, sql_filter):
+    #statistik header dihitung dengan GROUP BY sehingga baris data cukup dibaca sekali
+    preset_counts = {}
+    qty_actual = qty_ok = qty_not_ok = 0
+    for conn in sources:
+        rows = conn.execute(
+            f"SELECT preset, COALESCE(status, 'OK'), COUNT(*) FROM detected_codes {sql_filter} GROUP BY preset, COALESCE(status, 'OK')"
+        ).fetchall()
+        for preset, status, count in rows:
+            preset_counts[preset] = preset_counts.get(preset, 0) + count
+            qty_actual += count
+            if status == 'OK':
+                qty_ok += count
+            elif status == 'Not OK':
+                qty_not_ok += count
+    return preset_counts, qty_actual, qty_ok, qty_not_ok
+
+def _iter_rows(conn, sql_filter):
+    cursor = conn.execute(f"SELECT {_EXPORT_COLUMNS} FROM detected_codes {sql_filter} ORDER BY timestamp ASC")
+    while True:
+        chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield from chunk
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
 
-def execute_export(sql_filter="", date_range_desc="", export_label="", current_preset="", progress_callback=None, cancel_flag=None, qty_plan=0, show_qty_plan=True):
+def execute_export(sql_filter="", date_range_desc="", export_label="", current_preset="", progress_callback=None, cancel_flag=None, qty_plan=0, show_qty_plan=True, date_range=None):
 
     def update_progress(current, total, message=""):
         if progress_callback:
@@ -16,77 +70,52 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
     from config import EXCEL_DIR
     output_path = os.path.join(EXCEL_DIR, excel_filename)
     temp_files_to_clean = []
+    sources = []
+    workbook = None
+
+    def clean_temp_files():
+        for t_path in temp_files_to_clean:
+            if os.path.exists(t_path):
+                try:
+                    os.remove(t_path)
+                except:
+                    pass
 
     try:
         update_progress(0, 100, "Membuka database...")
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-
-        update_progress(5, 100, "Memeriksa struktur database...")
-        cursor.execute("PRAGMA table_info(detected_codes)")
-        columns = [column[1] for column in cursor.fetchall()]
-        has_status = 'status' in columns
-        has_target_session = 'target_session' in columns
-
-        update_progress(10, 100, "Mengambil data dari database...")
-        if has_status and has_target_session:
-            query = f"SELECT timestamp, code, preset, image_path, status, target_session FROM detected_codes {sql_filter} ORDER BY timestamp ASC"
-        elif has_status:
-            query = f"SELECT timestamp, code, preset, image_path, status, code as target_session FROM detected_codes {sql_filter} ORDER BY timestamp ASC"
-        else:
-            query = f"SELECT timestamp, code, preset, image_path, 'OK' as status, code as target_session FROM detected_codes {sql_filter} ORDER BY timestamp ASC"
+        flush_pending_writes()
+        sources = _open_snapshots(date_range)
 
-        df = pd.read_sql_query(query, conn)  #baca hasil query langsung ke DataFrame
-        conn.close()
+        update_progress(10, 100, "Menghitung statistik...")
+        preset_counts, qty_actual, qty_ok, qty_not_ok = _summarize(sources, sql_filter)
 
-        if df.empty:
+        if qty_actual == 0:
             update_progress(100, 100, "Tidak ada data")
             return "NO_DATA"
 
         update_progress(15, 100, "Memproses data...")
 
         export_preset = current_preset if current_preset else "Mixed"
-        if not current_preset:
-            if 'preset' in df.columns and not df['preset'].empty:
-                unique_presets = df['preset'].unique()
-                if len(unique_presets) == 1:
-                    export_preset = unique_presets[0]
-                else:
-                    export_preset = df['preset'].mode()[0] if not df['preset'].mode().empty else "Mixed"
+        if not current_preset and preset_counts:
+            if len(preset_counts) == 1:
+                export_preset = next(iter(preset_counts))
+            else:
+                known = [(-count, preset) for preset, count in preset_counts.items() if preset is not None]
+                export_preset = min(known)[1] if known else "Mixed"
 
         if export_label and export_label != "All Label":
             label_display = export_label
         else:
             label_display = "All Labels"
 
-        update_progress(20, 100, "Menghitung statistik...")
-        qty_actual = len(df)
-        qty_ok = len(df[df['status'] == 'OK'])
-        qty_not_ok = len(df[df['status'] == 'Not OK'])
-
         START_ROW_DATA = 8 if show_qty_plan else 7
-
-        update_progress(25, 100, "Menyiapkan data untuk Excel...")
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.insert(0, 'No', range(1, 1 + len(df)))
-        df['Image'] = ""
-        df.rename(columns={
-            'timestamp': 'Date/Time',
-            'code': 'Label',
-            'preset': 'Standard',
-            'image_path': 'Image Path',
-            'status': 'Status',
-            'target_session': 'Target Session'
-        }, inplace=True)
-        df = df[['No', 'Image', 'Label', 'Date/Time', 'Standard', 'Status', 'Image Path', 'Target Session']]
+        header_columns = ['No', 'Image', 'Label', 'Date/Time', 'Standard', 'Status', 'Image Path', 'Target Session']
 
         update_progress(30, 100, "Membuat file Excel...")
-        writer = pd.ExcelWriter(output_path, engine='xlsxwriter')
-
+        #constant_memory: baris langsung ditulis ke file sementara, jadi harus ditulis berurutan dari atas
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
         sheet_name = datetime.now().strftime("%Y-%m-%d")
-        df.to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=START_ROW_DATA)
-        workbook = writer.book
-        worksheet = writer.sheets[sheet_name]
+        worksheet = workbook.add_worksheet(sheet_name)
 
         update_progress(35, 100, "Mengatur format Excel...")
         header_format = workbook.add_format({'bold': True, 'align': 'center', 'valign': 'vcenter', 'font_color': 'white', 'bg_color': '#596CDAAD'})
@@ -98,6 +127,15 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
         not_ok_format = workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1, 'bg_color': '#FF0000', 'font_color': '#FFFFFF'})
         not_ok_datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss', 'align': 'center', 'valign': 'vcenter', 'border': 1, 'bg_color': '#FF0000', 'font_color': '#FFFFFF'})
 
+        worksheet.set_column('A:A', 5)
+        worksheet.set_column('B:B', 30)
+        worksheet.set_column('C:C', 20)
+        worksheet.set_column('D:D', 25)
+        worksheet.set_column('E:E', 10)
+        worksheet.set_column('F:F', 10)
+        worksheet.set_column('G:G', 0, options={'hidden': True})
+        worksheet.set_column('H:H', 0, options={'hidden': True})
+
         date_text = f"Date : {date_range_desc}"
         worksheet.merge_range('A1:B1', date_text, info_merge_format)
 
@@ -127,30 +165,22 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
         else:
             worksheet.merge_range('A6:B6', qty_text, info_merge_format)
 
-        for col_num, value in enumerate(df.columns.values):
+        for col_num, value in enumerate(header_columns):
             worksheet.write(START_ROW_DATA - 1, col_num, value, header_format)
 
-        worksheet.set_column('A:A', 5)
-        worksheet.set_column('B:B', 30)
-        worksheet.set_column('C:C', 20)
-        worksheet.set_column('D:D', 25)
-        worksheet.set_column('E:E', 10)
-        worksheet.set_column('F:F', 10)
-        worksheet.set_column('G:G', 0, options={'hidden': True})
-        worksheet.set_column('H:H', 0, options={'hidden': True})
-
         update_progress(40, 100, "Menulis data ke Excel...")
-        total_rows = len(df)
-        for row_num, row_data in df.iterrows():
+        total_rows = qty_actual
+        #arsip bulanan dan detection.db masing-masing sudah terurut, digabung tanpa memuat semuanya
+        rows = heapq.merge(*[_iter_rows(conn, sql_filter) for conn in sources], key=lambda r: r[0] or "")
+
+        for row_num, (timestamp, label, standard, image_path, status, target_session) in enumerate(rows):
             if cancel_flag is not None and getattr(cancel_flag, 'export_cancelled', False):
-                writer.close()
+                workbook.close()
+                workbook = None
                 if os.path.exists(output_path):
                     try: os.remove(output_path)
                     except: pass
-                for t_path in temp_files_to_clean:
-                    if os.path.exists(t_path):
-                        try: os.remove(t_path)
-                        except: pass
+                clean_temp_files()
                 return "CANCELLED"
 
             if row_num % 10 == 0 or row_num == total_rows - 1:
@@ -159,19 +189,11 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
 
             excel_row = row_num + START_ROW_DATA
 
-            image_path = row_data['Image Path']
-            status = row_data['Status']
-
             cell_format = not_ok_format if status == 'Not OK' else center_format
             datetime_format = not_ok_datetime_format if status == 'Not OK' else datetime_center_format
 
-            try:
-                worksheet.write(excel_row, 0, row_data['No'], cell_format)
-            except Exception:
-                worksheet.write(excel_row, 0, row_num + 1, cell_format)
-            worksheet.write(excel_row, 1, '', cell_format)
-
-            if os.path.exists(image_path):
+            #tinggi baris harus diatur sebelum sel di baris ini ditulis (constant_memory)
+            if image_path and os.path.exists(image_path):
                 temp_dir = tempfile.gettempdir()
                 thumbnail_filename = f"app_temp_thumb_{os.getpid()}_{row_num}.png"
                 thumbnail_path = os.path.join(temp_dir, thumbnail_filename)
@@ -189,7 +211,7 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
                     except IOError:
                         font = ImageFont.load_default()
 
-                    text_display = f"Detected: {row_data['Label']}"
+                    text_display = f"Detected: {label}"
                     bbox = draw.textbbox((10, img.height - 50), text_display, font=font)
                     draw.rectangle([bbox[0]-5, bbox[1]-5, bbox[2]+5, bbox[3]+5], fill=(0, 0, 0, 100))
                     draw.text((15, img.height - 50), text_display, fill=(255, 255, 0), font=font)
@@ -214,23 +236,28 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
                 except Exception as img_e:
                     print(f"Warning: Gagal memproses atau menyisipkan gambar untuk baris {row_num}: {img_e}")
 
-            worksheet.write(excel_row, 2, row_data['Label'], cell_format)
-            worksheet.write_datetime(excel_row, 3, row_data['Date/Time'], datetime_format)
-            worksheet.write(excel_row, 4, row_data['Standard'], cell_format)
-            worksheet.write(excel_row, 5, row_data['Status'], cell_format)
-            worksheet.write(excel_row, 6, row_data['Image Path'], cell_format)    
-            worksheet.write(excel_row, 7, row_data['Target Session'], cell_format)
+            worksheet.write(excel_row, 0, row_num + 1, cell_format)
+            worksheet.write(excel_row, 1, '', cell_format)
+            worksheet.write(excel_row, 2, label, cell_format)
+            parsed_time = _parse_timestamp(timestamp)
+            if parsed_time is not None:
+                worksheet.write_datetime(excel_row, 3, parsed_time, datetime_format)
+            else:
+                worksheet.write(excel_row, 3, timestamp, cell_format)
+            worksheet.write(excel_row, 4, standard, cell_format)
+            worksheet.write(excel_row, 5, status, cell_format)
+            worksheet.write(excel_row, 6, image_path, cell_format)
+            worksheet.write(excel_row, 7, target_session, cell_format)
+
+        _close_snapshots(sources)
+        sources = []
 
         update_progress(90, 100, "Menyimpan file Excel...")
-        writer.close()
+        workbook.close()
+        workbook = None
 
         update_progress(95, 100, "Membersihkan file temporary...")
-        for t_path in temp_files_to_clean:
-            if os.path.exists(t_path):
-                try:
-                    os.remove(t_path)
-                except:
-                    pass
+        clean_temp_files()
 
         update_progress(100, 100, "Export selesai!")
         return output_path
@@ -238,11 +265,15 @@ def execute_export(sql_filter="", date_range_desc="", export_label="", current_p
     except Exception as e:
         print(f"Export error: {e}")
         update_progress(100, 100, f"Error: {e}")
-        for t_path in temp_files_to_clean:
-            if os.path.exists(t_path):
-                try:
-                    os.remove(t_path)
-                except:
-                    pass
+        clean_temp_files()
 
-        return f"EXPORT_ERROR: {e}"
\ No newline at end of file
+        return f"EXPORT_ERROR: {e}"
+
+    finally:
+        if sources:
+            _close_snapshots(sources)
+        if workbook is not None:
+            try:
+                workbook.close()
+            except Exception:
+                pass
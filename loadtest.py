@@ -0,0 +1,343 @@
+import argparse
+import os
+import tempfile
+import statistics
+import sys
+import threading
+import time
+
+#uji beban lokal: N browser (Socket.IO + preview), M klien HTTP, export dan download gambar sekaligus,
+#lapor fps dan jeda frame per browser serta latensi API/export/gambar.
+#  python loadtest.py --spawn --mode production --clients 30 --http 6 --exports 2 --images 4 --duration 20
+#  python loadtest.py --url http://192.168.1.10:5000 --clients 5   (server yang sudah jalan, kamera aktif)
+#butuh: pip install "python-socketio[client]" requests websocket-client
+
+HTTP_PATHS = ['/api/snapshot.jpg', '/api/data/today', '/api/state', '/api/data/stats']
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _spawn_server(mode, port, fps, seed):
+    #server dijalankan di proses ini dengan frame sintetis, tanpa kamera, di folder sementara
+    #(detection.db dan images milik aplikasi tidak tersentuh)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="kartonocr_loadtest_"))
+    import numpy as np
+    import app as web
+    from capture import PreviewFrame
+    from server import run_server
+    from config import TARGET_WIDTH, TARGET_HEIGHT
+
+    threading.Thread(target=run_server, args=(web.app, web.socketio),
+                     kwargs={'host': '127.0.0.1', 'port': port, 'mode': mode}, daemon=True).start()
+
+    def feed():
+        #gradien + sedikit noise, ukuran JPEG mendekati frame kamera asli
+        gradient = np.linspace(0, 255, TARGET_WIDTH, dtype=np.float32)[None, :, None]
+        base = np.repeat(gradient, TARGET_HEIGHT, axis=0).repeat(3, axis=2)
+        base = np.clip(base + np.random.normal(0, 6, base.shape), 0, 255).astype(np.uint8)
+        interval = 1.0 / fps
+        step = 0
+        while True:
+            started = time.monotonic()
+            frame = np.roll(base, step * 8, axis=1)
+            web.publish_preview_frame(PreviewFrame(frame))
+            step += 1
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    threading.Thread(target=feed, daemon=True).start()
+
+    #deteksi sintetis hari ini (dengan gambar) supaya export dan /api/image punya data
+    from persistence import get_writer
+    writer = get_writer()
+    label_image = np.clip(np.random.normal(128, 40, (480, 480, 3)), 0, 255).astype(np.uint8)
+    today = time.strftime('%Y-%m-%d')
+    for i in range(seed):
+        writer.submit(f"{today} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}", "55B24L", "JIS",
+                      os.path.join("images", f"loadtest_{i}.jpg"), "OK" if i % 5 else "Not OK", "55B24L",
+                      image=label_image)
+    writer.flush(30)
+    return f"http://127.0.0.1:{port}"
+
+class BrowserClient:
+    #meniru index.html: Socket.IO untuk event, preview lewat frame Socket.IO (dengan ack)
+    #atau /api/stream.mjpg kalau server memberi tahu preview='mjpeg' (mode production)
+
+    def __init__(self, url, index, transports):
+        import socketio
+        self.url = url
+        self.index = index
+        self.frames = []
+        self.received = []
+        self.preview = None
+        self.snapshot_mode = False
+        self.error = None
+        self._closed = False
+        self._ready = threading.Event()
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('init_data', self._on_init)
+        self.sio.on('frame', self._on_frame)
+        try:
+            self.sio.connect(url, transports=transports, wait_timeout=10)
+            self._ready.wait(10)
+        except Exception as e:
+            self.error = str(e)
+            return
+
+        if self.preview == 'mjpeg':
+            self.sio.emit('preview_config', {'enabled': False})
+            threading.Thread(target=self._read_mjpeg, daemon=True).start()
+
+    def _on_init(self, data):
+        self.preview = data.get('preview', 'socket')
+        self._ready.set()
+
+    def _on_frame(self, data):
+        now = time.monotonic()
+        self.frames.append(now)
+        self.received.append((now, len(data.get('img') or b'')))
+        #nilai return dikirim sebagai ack, server baru mengirim frame berikutnya setelah ini
+        return True
+
+    def _read_mjpeg(self):
+        import requests
+        session = requests.Session()
+        while not self._closed:
+            try:
+                response = session.get(self.url + '/api/stream.mjpg', stream=True, timeout=10)
+                if response.status_code == 503:
+                    #slot stream penuh: seperti index.html, polling snapshot lalu coba stream lagi
+                    response.close()
+                    self.snapshot_mode = True
+                    self._poll_snapshot(session, time.monotonic() + 15.0)
+                    continue
+                self.snapshot_mode = False
+                for chunk in response.iter_content(65536):
+                    if self._closed:
+                        break
+                    now = time.monotonic()
+                    self.received.append((now, len(chunk)))
+                    self.frames.extend([now] * chunk.count(b'--frame\r\n'))
+                response.close()
+            except Exception as e:
+                self.error = f"mjpeg: {e}"
+                return
+
+    def _poll_snapshot(self, session, retry_at):
+        while not self._closed and time.monotonic() < retry_at:
+            response = session.get(self.url + '/api/snapshot.jpg', timeout=10)
+            now = time.monotonic()
+            if response.status_code == 200:
+                self.frames.append(now)
+                self.received.append((now, len(response.content)))
+            time.sleep(0.2)
+
+    def close(self):
+        self._closed = True
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    def summary(self, started, ended):
+        frames = [t for t in self.frames if started <= t <= ended]
+        duration = max(ended - started, 1e-3)
+        gaps = [b - a for a, b in zip(frames, frames[1:])]
+        first_gap = (frames[0] - started) if frames else duration
+        return {
+            'fps': len(frames) / duration,
+            'max_gap': max(gaps + [first_gap]),
+            'kbps': sum(size for t, size in self.received if started <= t <= ended) * 8 / 1000 / duration,
+        }
+
+def _http_worker(url, stop, latencies, errors):
+    import requests
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        path = HTTP_PATHS[i % len(HTTP_PATHS)]
+        i += 1
+        started = time.monotonic()
+        try:
+            response = session.get(url + path, timeout=10)
+            if response.status_code >= 500 and response.status_code != 503:
+                errors.append(f"{path} {response.status_code}")
+        except Exception as e:
+            errors.append(f"{path} {e}")
+            continue
+        latencies.setdefault(path, []).append(time.monotonic() - started)
+
+def _image_worker(url, stop, latencies, errors):
+    #download gambar deteksi seperti klik baris di tabel (imgUrl dari /api/data/today)
+    import requests
+    session = requests.Session()
+    try:
+        urls = [r['imgUrl'] for r in session.get(url + '/api/data/today', timeout=10).json().get('records', [])
+                if r.get('imgUrl')]
+    except Exception as e:
+        errors.append(f"/api/data/today {e}")
+        return
+    if not urls:
+        errors.append("/api/image tidak ada gambar (jalankan dengan --seed)")
+        return
+
+    i = 0
+    while not stop.is_set():
+        path = urls[i % len(urls)]
+        i += 1
+        started = time.monotonic()
+        try:
+            response = session.get(url + path, timeout=10)
+            if response.status_code != 200:
+                errors.append(f"{path} {response.status_code}")
+                continue
+        except Exception as e:
+            errors.append(f"{path} {e}")
+            continue
+        latencies.setdefault('/api/image', []).append(time.monotonic() - started)
+
+def _export_worker(url, stop, latencies, errors):
+    #export Excel hari ini sampai selesai (event export_done) lalu download, berulang
+    import requests
+    import socketio
+    session = requests.Session()
+    done = threading.Event()
+    result = {}
+    sio = socketio.Client(reconnection=False)
+
+    def on_done(data):
+        result.update(data)
+        done.set()
+
+    sio.on('export_done', on_done)
+    try:
+        sio.connect(url, transports=['polling'], wait_timeout=10)
+    except Exception as e:
+        errors.append(f"export socket {e}")
+        return
+
+    while not stop.is_set():
+        done.clear()
+        result.clear()
+        started = time.monotonic()
+        try:
+            reply = session.post(url + '/api/export', json={'date_range': 'Today', 'label': 'All Label'}, timeout=10).json()
+        except Exception as e:
+            errors.append(f"/api/export {e}")
+            continue
+        if not reply.get('ok'):
+            #export lain sedang berjalan (satu export sekaligus), coba lagi
+            time.sleep(0.2)
+            continue
+        if not done.wait(120):
+            errors.append("/api/export tidak selesai dalam 120 s")
+            continue
+        if not result.get('ok'):
+            errors.append(f"/api/export {result.get('msg')}")
+            continue
+        try:
+            response = session.get(url + '/api/export/download/' + result['filename'], timeout=30)
+            if response.status_code != 200:
+                errors.append(f"/api/export/download {response.status_code}")
+                continue
+        except Exception as e:
+            errors.append(f"/api/export/download {e}")
+            continue
+        latencies.setdefault('/api/export', []).append(time.monotonic() - started)
+
+    try:
+        sio.disconnect()
+    except Exception:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban preview + API KartonOCR")
+    parser.add_argument('--url', default=None, help="server yang sudah berjalan")
+    parser.add_argument('--spawn', action='store_true', help="jalankan server di proses ini dengan frame sintetis")
+    parser.add_argument('--mode', default='production', choices=['dev', 'production'])
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--fps', type=float, default=15.0, help="FPS frame sintetis (--spawn)")
+    parser.add_argument('--clients', type=int, default=30)
+    parser.add_argument('--http', type=int, default=4)
+    parser.add_argument('--exports', type=int, default=1, help="klien yang export + download terus-menerus")
+    parser.add_argument('--images', type=int, default=2, help="klien yang mengunduh gambar deteksi")
+    parser.add_argument('--seed', type=int, default=200, help="jumlah deteksi sintetis (--spawn)")
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--max-gap', type=float, default=2.0, help="jeda frame maksimum sebelum dianggap starvation")
+    parser.add_argument('--min-fps', type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.spawn or not args.url:
+        url = _spawn_server(args.mode, args.port, args.fps, args.seed)
+        time.sleep(2.0)
+    else:
+        url = args.url.rstrip('/')
+
+    transports = ['polling'] if args.mode == 'production' else ['polling', 'websocket']
+    clients = [BrowserClient(url, i, transports) for i in range(args.clients)]
+
+    stop = threading.Event()
+    latencies = {}
+    errors = []
+    workers = [threading.Thread(target=target, args=(url, stop, latencies, errors), daemon=True)
+               for target, count in ((_http_worker, args.http), (_image_worker, args.images), (_export_worker, args.exports))
+               for _ in range(count)]
+
+    #detik pertama diabaikan (koneksi awal)
+    time.sleep(1.0)
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    time.sleep(args.duration)
+    ended = time.monotonic()
+    stop.set()
+    for worker in workers:
+        worker.join(5)
+
+    preview_modes = sorted({c.preview for c in clients if c.preview})
+    print(f"\n== Browser ({len(clients)} client, {args.duration:.0f} s, Socket.IO {'/'.join(transports)}, "
+          f"preview {'/'.join(preview_modes) or '-'}) ==")
+    starved = 0
+    fps_values = []
+    for client in clients:
+        if client.error:
+            starved += 1
+            print(f"  client {client.index:2d}: GAGAL connect ({client.error})")
+            continue
+        s = client.summary(started, ended)
+        fps_values.append(s['fps'])
+        bad = s['fps'] < args.min_fps or s['max_gap'] > args.max_gap
+        starved += bad
+        print(f"  client {client.index:2d}: {s['fps']:5.1f} fps  jeda maks {s['max_gap'] * 1000:6.0f} ms  "
+              f"{s['kbps']:7.0f} kbps{'  snapshot' if client.snapshot_mode else ''}{'  <-- STARVED' if bad else ''}")
+        client.close()
+    if fps_values:
+        print(f"  fps min/median/max: {min(fps_values):.1f} / {statistics.median(fps_values):.1f} / {max(fps_values):.1f}")
+
+    snapshot_clients = sum(1 for c in clients if c.snapshot_mode)
+    if snapshot_clients:
+        print(f"  {snapshot_clients} client memakai polling snapshot (slot stream MJPEG penuh)")
+
+    print(f"\n== HTTP ({args.http} API, {args.images} gambar, {args.exports} export) ==")
+    total = 0
+    for path in HTTP_PATHS + ['/api/image', '/api/export']:
+        values = latencies.get(path, [])
+        total += len(values)
+        print(f"  {path:22s} {len(values):6d} req  p50 {_percentile(values, 50) * 1000:6.1f} ms  "
+              f"p95 {_percentile(values, 95) * 1000:6.1f} ms  maks {max(values or [0]) * 1000:6.1f} ms")
+    print(f"  total {total / max(ended - started, 1e-3):.0f} req/s, error {len(errors)}")
+    for error in errors[:5]:
+        print(f"    {error}")
+
+    #export harus tetap selesai walau semua browser membuka preview
+    exports_done = len(latencies.get('/api/export', []))
+    ok = starved == 0 and len(errors) <= max(1, total // 100) and (exports_done > 0 or not args.exports)
+    print(f"\nHASIL: {'OK' if ok else 'GAGAL'} ({starved} client starved)")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
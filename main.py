@@ -26,4 +26,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,250 @@
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+import numpy as np
+import config
+from config import JIS_TYPES, DIN_TYPES, MATCH_CACHE_SIZE
+
+#toleransi pembulatan saat membandingkan batas atas dengan threshold
+_EPS = 1e-9
+
+_ISS_END = re.compile(r'ISS$')
+_ISS_END_SPACED = re.compile(r'\s*ISS$')
+_DIN_REVERSE = re.compile(r'LN[0-6]$')
+_DIN_FORWARD = re.compile(r'^LN[0-6]')
+
+def _ratio(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+def _char_counts(text):
+    counts = np.zeros(128, dtype=np.int16)
+    for ch in text:
+        counts[min(ord(ch), 127)] += 1
+    return counts
+
+class _KeyBounds:
+    #batas atas SequenceMatcher.ratio() = 2*M/T, dengan M <= jumlah karakter yang sama (multiset)
+    #dihitung sekaligus untuk seluruh katalog, sehingga hanya kandidat yang mungkin lolos yang dicek difflib
+
+    def __init__(self, keys):
+        self.lengths = np.array([len(k) for k in keys], dtype=np.int32)
+        self.counts = np.zeros((len(keys), 128), dtype=np.int16)
+        for i, key in enumerate(keys):
+            self.counts[i] = _char_counts(key)
+
+    def upper_bounds(self, text):
+        common = np.minimum(self.counts, _char_counts(text)).sum(axis=1)
+        total = self.lengths + len(text)
+        return np.where(total > 0, 2.0 * common / np.maximum(total, 1), 1.0)
+
+class JisMatcher:
+
+    def __init__(self, types):
+        self.rebuild(types)
+
+    def rebuild(self, types):
+        self.types = types
+        self.entries = list(types[1:])
+        self.type_set = set(types)
+
+        self.keys = [t.replace(' ', '').upper() for t in self.entries]
+        self.keys_without_s = [t.replace(' ', '').replace('(S)', '').upper() for t in self.entries]
+        self.has_s = [('(S)' in t) for t in self.entries]
+
+        self.exact = {}
+        for key, jis_type in zip(self.keys, self.entries):
+            self.exact.setdefault(key, jis_type)
+
+        self._bounds = _KeyBounds(self.keys)
+        self._bounds_without_s = _KeyBounds(self.keys_without_s)
+
+    def match(self, detected_clean):
+        exact = self.exact.get(detected_clean)
+        if exact is not None:
+            return exact, 1.0
+
+        best_match = None
+        best_score = 0.0
+
+        ub = self._bounds.upper_bounds(detected_clean)
+        for i in np.flatnonzero(ub + _EPS > 0.85):
+            if ub[i] + _EPS <= best_score:
+                continue
+
+            ratio = _ratio(detected_clean, self.keys[i])
+            if ratio > 0.85 and ratio > best_score:
+                best_score = ratio
+                best_match = self.entries[i]
+
+        if not best_match or best_score < 0.90:
+            detected_without_s = detected_clean.replace('(S)', '')
+            detected_has_s = '(S)' in detected_clean
+
+            ub = self._bounds_without_s.upper_bounds(detected_without_s)
+            for i in np.flatnonzero(ub + _EPS > 0.90):
+                if not detected_has_s and (self.has_s[i] or ub[i] + _EPS <= best_score):
+                    continue
+
+                ratio = _ratio(detected_without_s, self.keys_without_s[i])
+                if ratio > 0.90:
+                    if detected_has_s:
+                        base_code = self.entries[i].replace('(S)', '')
+                        candidate_with_s = base_code + '(S)'
+
+                        if candidate_with_s in self.type_set:
+                            best_match = candidate_with_s
+                            best_score = ratio
+                            break
+                    else:
+                        if ratio > best_score:
+                            best_match = self.entries[i]
+                            best_score = ratio
+
+        return best_match, best_score
+
+class DinMatcher:
+
+    def __init__(self, types):
+        self.rebuild(types)
+
+    def rebuild(self, types):
+        self.types = types
+        self.entries = list(types[1:])
+        self.type_set = set(types)
+
+        self.keys = [t.replace(' ', '').upper() for t in self.entries]
+        self.keys_no_iss = [_ISS_END.sub('', k) for k in self.keys]
+        self.key_has_iss = np.array([k != kn for k, kn in zip(self.keys, self.keys_no_iss)], dtype=bool)
+        self.iss_in_type = [('ISS' in t) for t in self.entries]
+
+        self.exact = {}
+        for key, din_type in zip(self.keys, self.entries):
+            self.exact.setdefault(key, din_type)
+
+        self._bounds = _KeyBounds(self.keys)
+        self._bounds_no_iss = _KeyBounds(self.keys_no_iss)
+
+    def match(self, detected_clean):
+        if len(detected_clean) < 2:
+            return None, 0.0
+
+        exact = self.exact.get(detected_clean)
+        if exact is not None:
+            return exact, 1.0
+
+        detected_no_iss = _ISS_END_SPACED.sub('', detected_clean)
+        detected_has_iss = detected_no_iss != detected_clean
+
+        if len(detected_clean) <= 4:
+            adaptive_threshold = 0.75
+        elif _DIN_REVERSE.search(detected_clean) or _DIN_FORWARD.match(detected_clean):
+            adaptive_threshold = 0.70
+        else:
+            adaptive_threshold = 0.82
+
+        ub = self._bounds.upper_bounds(detected_clean)
+        ub_no_iss = self._bounds_no_iss.upper_bounds(detected_no_iss)
+        iss_possible = (self.key_has_iss | detected_has_iss) & (ub_no_iss + _EPS >= 0.88)
+        candidates = np.flatnonzero((ub + _EPS >= adaptive_threshold) | iss_possible)
+
+        best_match = None
+        best_score = 0.0
+
+        for i in candidates:
+            ratio = None
+
+            if ub[i] + _EPS >= adaptive_threshold and ub[i] + _EPS > best_score:
+                ratio = _ratio(detected_clean, self.keys[i])
+                if ratio >= adaptive_threshold and ratio > best_score:
+                    best_score = ratio
+                    best_match = self.entries[i]
+
+            if not iss_possible[i] or ub_no_iss[i] + _EPS <= best_score:
+                continue
+
+            #cabang tanpa ISS hanya berlaku jika rasio penuh < 0.88
+            if ub[i] + _EPS >= 0.88:
+                if ratio is None:
+                    ratio = _ratio(detected_clean, self.keys[i])
+                if ratio >= 0.88:
+                    continue
+
+            ratio_no_iss = _ratio(detected_no_iss, self.keys_no_iss[i])
+            if ratio_no_iss >= 0.88 and ratio_no_iss > best_score:
+                din_type = self.entries[i]
+                if 'ISS' in detected_clean and not self.iss_in_type[i]:
+                    iss_candidate = din_type + ' ISS'
+                    if iss_candidate in self.type_set:
+                        best_score = ratio_no_iss
+                        best_match = iss_candidate
+                elif not self.iss_in_type[i]:
+                    best_score = ratio_no_iss
+                    best_match = din_type
+
+        return best_match, best_score
+
+    def contains(self, code_normalized):
+        return code_normalized in self.exact
+
+class MatchCache:
+    #LRU (preset, teks mentah) -> (label, skor), dikosongkan saat katalog berubah
+
+    def __init__(self, maxsize=MATCH_CACHE_SIZE):
+        self.maxsize = max(0, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, compute, *args):
+        if self.maxsize == 0:
+            return compute(*args)
+
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            version = self.version
+
+        value = compute(*args)
+
+        with self._lock:
+            #hasil dari katalog lama tidak disimpan
+            if version == self.version:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.version += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'match_cache_size': len(self._data),
+                'match_cache_max': self.maxsize,
+                'match_cache_hits': self.hits,
+                'match_cache_misses': self.misses,
+                'match_cache_hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+JIS_MATCHER = JisMatcher(JIS_TYPES)
+DIN_MATCHER = DinMatcher(DIN_TYPES)
+MATCH_CACHE = MatchCache()
+
+def reload_catalogs():
+    #reload_types gagal (type.db tidak terbaca): exception diteruskan, matcher dan cache tidak diubah
+    config.reload_types()
+    JIS_MATCHER.rebuild(JIS_TYPES)
+    DIN_MATCHER.rebuild(DIN_TYPES)
+    MATCH_CACHE.clear()
@@ -7,20 +7,27 @@ import threading
 import atexit
 import numpy as np
 from datetime import datetime
-from difflib import SequenceMatcher
-from PIL import Image
 from config import (
-    IMAGE_DIR, EXCEL_DIR, DB_FILE, PATTERNS, ALLOWLIST_JIS, ALLOWLIST_DIN, DIN_TYPES,
+    IMAGE_DIR, EXCEL_DIR, DB_FILE, PATTERNS, ALLOWLIST_JIS, ALLOWLIST_DIN,
     CAMERA_WIDTH, CAMERA_HEIGHT, TARGET_WIDTH, TARGET_HEIGHT, BUFFER_SIZE,
-    MAX_CAMERAS, SCAN_INTERVAL, JIS_TYPES
+    MAX_CAMERAS, SCAN_INTERVAL, OCR_BACKEND, OCR_WORKERS, OCR_BATCH_STAGES, OCR_STAGE_EARLY_EXIT,
+    ROI_PADDING, ROI_MIN_PADDING, ROI_MAX_MISSES, DEDUP_WINDOW
 )
 from utils import (
-    fix_common_ocr_errors, convert_frame_to_binary, find_external_camera,
+    convert_frame_to_binary, find_external_camera,
     create_directories, apply_edge_detection
 )
 from database import (
-    setup_database, load_existing_data, insert_detection
+    setup_database, load_existing_data
 )
+from persistence import get_writer
+from reaper import get_reaper
+from partition import image_dir_for, start_rollover_job
+from stats import DETECTION_STATS
+from capture import FrameRingBuffer, FrameGate, PreviewFrame, resize_frame
+from matcher import JIS_MATCHER, DIN_MATCHER, MATCH_CACHE
+from correction import correct, normalize_din_code, detect_code_type
+from ocr_worker import OcrWorkerPool
 
 class DetectionLogic(threading.Thread):
 
@@ -55,10 +62,18 @@ class DetectionLogic(threading.Thread):
         self.patterns = PATTERNS
 
         setup_database()
-        self.detected_codes = load_existing_data(self.current_date)
+        self.writer = get_writer()
+        start_rollover_job()
+        self.reaper = get_reaper()
+        self.dedup_window = DEDUP_WINDOW
+        self._last_seen = {}
+        self.set_detected_codes(load_existing_data(self.current_date))
 
         if shared_reader is not None:
             self.reader = shared_reader
+        elif OCR_BACKEND == "process":
+            from ocr_process import get_process_reader
+            self.reader = get_process_reader()
         else:
             try:
                 import torch
@@ -68,6 +83,16 @@ class DetectionLogic(threading.Thread):
             self.reader = easyocr.Reader(['en'], gpu=_gpu_available, verbose=False)
 
         self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self.batch_stages = OCR_BATCH_STAGES
+        self.stage_early_exit = OCR_STAGE_EARLY_EXIT
+
+        #ROI dipakai bersama oleh semua worker OCR, baca dan ubah hanya di bawah _roi_lock
+        self._roi_lock = threading.Lock()
+        self._roi_box = None
+        self._roi_key = None
+        self._roi_miss_streak = 0
+        self.roi_hits = 0
+        self.roi_misses = 0
 
         atexit.register(self.cleanup_temp_files)
 
@@ -76,6 +101,13 @@ class DetectionLogic(threading.Thread):
         self.bbox_timestamp = 0
         self.bbox_display_duration = 3.0
 
+        self.frame_buffer = FrameRingBuffer()
+        self.frame_gate = FrameGate()
+        self._preview_frame = None
+        #satu worker thread per proses OCR supaya semua core terpakai
+        ocr_workers = max(OCR_WORKERS, getattr(self.reader, 'processes', 1))
+        self.ocr_pool = OcrWorkerPool(self._run_scan_job, workers=ocr_workers)
+
     def cleanup_temp_files(self):
         for t_path in self.temp_files_on_exit:
             if os.path.exists(t_path):
@@ -106,27 +138,77 @@ class DetectionLogic(threading.Thread):
 
         self.camera_status_signal.emit("Camera Running", True)
 
+        self.frame_buffer = FrameRingBuffer()
+        capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        capture_thread.start()
+
+        last_seq = 0
         while self.running:
-            ret, frame = self.cap.read()
+            seq, frame = self.frame_buffer.get_latest(after_seq=last_seq, timeout=1.0, out=self._preview_frame)
 
-            if not ret:
-                break
+            if frame is None:
+                if self.frame_buffer.closed:
+                    break
+                continue
 
+            last_seq = seq
+            self._preview_frame = frame
             self._process_and_send_frame(frame, is_static=False)
             current_time = time.time()
 
-            if current_time - self.last_scan_time >= self.scan_interval and not self.scan_lock.locked():
-                self.last_scan_time = current_time
-                threading.Thread(target=self.scan_frame,
-                                args=(frame.copy(),),
-                                kwargs={'is_static': False, 'original_frame': frame.copy()},
-                                daemon=True).start()
+            if current_time - self.last_scan_time >= self.scan_interval and self.ocr_pool.idle_workers() > 0:
+                #jadwal scan tetap, tapi frame diam/blur dilewati sampai ada frame yang layak
+                if self.frame_gate.check(frame, current_time):
+                    self.last_scan_time = current_time
+                    self._submit_latest_frame()
+
+        self.frame_buffer.close()
+        capture_thread.join(timeout=2.0)
 
         if self.cap:
             self.cap.release()
 
         self.camera_status_signal.emit("Camera Off", False)
 
+    def _capture_loop(self):
+        try:
+            while self.running:
+                if not self.frame_buffer.capture_from(self.cap):
+                    break
+        except Exception as e:
+            print(f"Capture error: {e}")
+        finally:
+            self.frame_buffer.close()
+
+    def _submit_latest_frame(self):
+        #ambil frame paling baru dari ring buffer, bukan frame yang sedang dipakai preview
+        if self._preview_frame is None:
+            return
+
+        buf = self.ocr_pool.acquire_buffer(self._preview_frame)
+        _, frame = self.frame_buffer.get_latest(timeout=0, out=buf)
+
+        if frame is None:
+            self.ocr_pool.release_buffer(buf)
+        elif frame is buf:
+            self.ocr_pool.submit_buffer(buf, is_static=False)
+        else:
+            self.ocr_pool.submit(frame, copy=False, is_static=False)
+
+    def _run_scan_job(self, frame, is_static=False):
+        #scan_frame tidak mengubah frame input, jadi satu buffer cukup untuk OCR dan simpan gambar
+        self.scan_frame(frame, is_static=is_static, original_frame=frame)
+
+    def get_ocr_stats(self):
+        stats = self.ocr_pool.stats()
+        stats['roi_hits'] = self.roi_hits
+        stats['roi_misses'] = self.roi_misses
+        stats.update(self.frame_gate.stats())
+        stats.update(MATCH_CACHE.stats())
+        stats.update(self.writer.stats())
+        stats.update(self.reaper.stats())
+        return stats
+
     def _draw_bounding_box(self, frame, bbox, label_text):
         if bbox is None or len(bbox) == 0:
             return frame
@@ -158,17 +240,12 @@ class DetectionLogic(threading.Thread):
             start_x = (w - min_dim) // 2
             start_y = (h - min_dim) // 2
             frame_cropped = frame_with_box[start_y:start_y + min_dim, start_x:start_x + min_dim]
-            frame_rgb = cv2.cvtColor(frame_cropped, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            from config import Resampling
-            img = img.resize((self.TARGET_WIDTH, self.TARGET_HEIGHT), Resampling)
-            self.update_signal.emit(img)
+            self.update_signal.emit(PreviewFrame(resize_frame(frame_cropped, self.TARGET_WIDTH, self.TARGET_HEIGHT)))
         except Exception as e:
             print(f"Error sending bbox update: {e}")
 
     def _process_and_send_frame(self, frame, is_static):
-        from PIL import Image
-        frame_display = frame.copy()
+        frame_display = frame
         current_time = time.time()
 
         if self.last_detected_bbox is not None and self.last_detected_code is not None:
@@ -190,368 +267,285 @@ class DetectionLogic(threading.Thread):
 
             if self.split_mode:
                 TARGET_CONTENT_SIZE = self.TARGET_HEIGHT // 2
-                frame_scaled_320 = cv2.resize(frame_cropped, (TARGET_CONTENT_SIZE, TARGET_CONTENT_SIZE), interpolation=cv2.INTER_AREA)
+                frame_scaled_320 = resize_frame(frame_cropped, TARGET_CONTENT_SIZE, TARGET_CONTENT_SIZE)
 
                 frame_top_edge = apply_edge_detection(frame_scaled_320.copy())
-                frame_bottom_original = frame_scaled_320.copy()
 
-                canvas_top = np.zeros((TARGET_CONTENT_SIZE, self.TARGET_WIDTH, 3), dtype=np.uint8)
-                canvas_bottom = np.zeros((TARGET_CONTENT_SIZE, self.TARGET_WIDTH, 3), dtype=np.uint8)
+                frame_combined = np.zeros((TARGET_CONTENT_SIZE * 2, self.TARGET_WIDTH, 3), dtype=np.uint8)
                 x_offset = (self.TARGET_WIDTH - TARGET_CONTENT_SIZE) // 2
 
-                canvas_top[:, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_top_edge
-                canvas_bottom[:, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_bottom_original
-                frame_combined = np.vstack([canvas_top, canvas_bottom])
-
-                frame_rgb = cv2.cvtColor(frame_combined, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
+                frame_combined[:TARGET_CONTENT_SIZE, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_top_edge
+                frame_combined[TARGET_CONTENT_SIZE:, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_scaled_320
+                preview = frame_combined
 
             else:
-                frame_rgb = cv2.cvtColor(frame_cropped, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                from config import Resampling
-                img = img.resize((self.TARGET_WIDTH, self.TARGET_HEIGHT), Resampling)
+                #frame kamera tidak dimodifikasi: crop hanya view, resize langsung ke buffer baru
+                preview = resize_frame(frame_cropped, self.TARGET_WIDTH, self.TARGET_HEIGHT)
 
         else:
             if self.edge_mode or self.split_mode:
                 frame_display = apply_edge_detection(frame_display)
 
-            frame_rgb = cv2.cvtColor(frame_display, cv2.COLOR_BGR2RGB)
-            original_img = Image.fromarray(frame_rgb)
-            original_width, original_height = original_img.size
+            original_height, original_width = frame_display.shape[:2]
             ratio = min(self.TARGET_WIDTH / original_width, self.TARGET_HEIGHT / original_height)
 
-            new_width = int(original_width * ratio)
-            new_height = int(original_height * ratio)
-
-            from config import Resampling
+            new_width = max(1, int(original_width * ratio))
+            new_height = max(1, int(original_height * ratio))
 
-            img_resized = original_img.resize((new_width, new_height), Resampling)
-            img = Image.new('RGB', (self.TARGET_WIDTH, self.TARGET_HEIGHT), 'black')
+            preview = np.zeros((self.TARGET_HEIGHT, self.TARGET_WIDTH, 3), dtype=np.uint8)
 
             x_offset = (self.TARGET_WIDTH - new_width) // 2
             y_offset = (self.TARGET_HEIGHT - new_height) // 2
 
-            img.paste(img_resized, (x_offset, y_offset))
-
-            from PIL import ImageDraw, ImageFont
-            draw = ImageDraw.Draw(img)
-
-            try:
-                font = ImageFont.truetype("arial.ttf", 10)
-            except IOError:
-                font = ImageFont.load_default()
+            preview[y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resize_frame(frame_display, new_width, new_height)
 
             text_to_display = "STATIC FILE SCAN"
-            bbox = draw.textbbox((0, 0), text_to_display, font=font)
-            text_width = bbox[2] - bbox[0]
+            (text_width, text_height), _ = cv2.getTextSize(text_to_display, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)
             x_center = (self.TARGET_WIDTH - text_width) // 2
             y_top = 12
 
-            draw.text((x_center, y_top), text_to_display, fill=(255, 255, 0), font=font)
-
-        self.update_signal.emit(img)
-
-    def _normalize_din_code(self, code):
-        code = code.strip().upper()
-        code_no_space = re.sub(r'\s+', '', code)
-        match = re.match(r'^(\d+[A-Z]?)(LN\d)$', code_no_space)
-        if match:
-            return code_no_space
-        match = re.match(r'^(LBN)(\d)$', code_no_space)
-        if match:
-            return f"{match.group(1)} {match.group(2)}"
-        match = re.match(r'^(LN\d)$', code_no_space)
-        if match:
-            return match.group(1)
-        match = re.match(r'^(LN\d)(\d+)([A-Z])(ISS)$', code_no_space)
-        if match:
-            return f"{match.group(1)} {match.group(2)}{match.group(3)} {match.group(4)}"
-        match = re.match(r'^(LN\d)(\d+)([A-Z])$', code_no_space)
-        if match:
-            return f"{match.group(1)} {match.group(2)}{match.group(3)}"
-        match = re.match(r'^(LN\d)(\d+)$', code_no_space)
-        if match:
-            return f"{match.group(1)} {match.group(2)}"
-        code_spaced = re.sub(r'\s+', ' ', code).strip()
-        code_spaced = re.sub(r'([A-Z0-9])(ISS)$', r'\1 \2', code_spaced)
-        return code_spaced
-
-    def _correct_din_structure(self, text):
-        digit_map = {'O':'0','Q':'0','I':'1','L':'1','Z':'2','S':'5','G':'6','B':'8'}
-
-        text = text.strip().upper()
-        text = re.sub(r'[^A-Z0-9\s]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        text = re.sub(
-            r'LN([OQILZSGB])(?=\s|$|\d)',
-            lambda m: 'LN' + digit_map.get(m.group(1), m.group(1)),
-            text
-        )
-        text = re.sub(
-            r'LN([OQILZSGB])$',
-            lambda m: 'LN' + digit_map.get(m.group(1), m.group(1)),
-            text
-        )
-        text = re.sub(r'\bL\s+N\s*([0-6])', r'LN\1', text)
-        text = re.sub(r'\bL\s+B\s*N\b', 'LBN', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        m_rev = re.match(r'^([0-9A-Z]{2,5})\s*LN\s*([0-6])\s*$', text)
-        if m_rev:
-            raw_num = m_rev.group(1)
-            corrected_num = ''.join(digit_map.get(c, c) for c in raw_num)
-            digits_only = re.sub(r'[A-Z]', '', corrected_num)
-            final_num = digits_only if len(digits_only) >= 2 else corrected_num
-            return f"{final_num}LN{m_rev.group(2)}"
-
-        m_rev2 = re.search(r'^([0-9A-Z]{2,5})\s*(?:1N|IN|LH|LM)\s*([0-6])\s*$', text)
-        if m_rev2:
-            raw_num = m_rev2.group(1)
-            corrected_num = ''.join(digit_map.get(c, c) for c in raw_num)
-            digits_only = re.sub(r'[A-Z]', '', corrected_num)
-            final_num = digits_only if len(digits_only) >= 2 else corrected_num
-            return f"{final_num}LN{m_rev2.group(2)}"
-
-        m_lna_iss = re.match(r'^(LN[0-6])\s+([0-9A-Z]{2,5})([A-Z])\s+(ISS|I55|IS5|I5S|155|1SS)\s*$', text)
-        if m_lna_iss:
-            corrected_cap = ''.join(digit_map.get(c, c) for c in m_lna_iss.group(2))
-            suffix = 'A' if m_lna_iss.group(3) in ['A', '4'] else m_lna_iss.group(3)
-            return f"{m_lna_iss.group(1)} {corrected_cap}{suffix} ISS"
-
-        m_lna = re.match(r'^(LN[0-6])\s+([0-9A-Z]{2,5})([A-Z])\s*$', text)
-        if m_lna:
-            corrected_cap = ''.join(digit_map.get(c, c) for c in m_lna.group(2))
-            suffix = 'A' if m_lna.group(3) in ['A', '4'] else m_lna.group(3)
-            return f"{m_lna.group(1)} {corrected_cap}{suffix}"
-
-        text = re.sub(r'^(LBN)(\d)', r'\1 \2', text)
-        text = re.sub(r'^(LN[0-6])(\d)', r'\1 \2', text)
-        text = re.sub(r'([A-Z0-9])\s*(ISS)$', r'\1 \2', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        tokens = text.split()
-        if not tokens:
-            return text
-
-        corrected_tokens = []
-        for i, token in enumerate(tokens):
-            if i == 0:
-                corrected = ''
-                for j, char in enumerate(token):
-                    if j == 0:
-                        corrected += 'L' if char in ['1', 'I', 'l'] else char
-                    elif j == 1:
-                        if char == '8':         corrected += 'B'
-                        elif char in ['H','M']: corrected += 'N'
-                        else:                   corrected += char
-                    elif j == 2:
-                        if corrected == 'LB':
-                            corrected += 'N' if char in ['H','M'] else char
-                        else:
-                            corrected += digit_map.get(char, char)
-                    else:
-                        corrected += char
-                corrected_tokens.append(corrected)
-
-            elif i == 1:
-                corrected = ''
-                for j, char in enumerate(token):
-                    is_last = (j == len(token) - 1)
-                    if char.isdigit():
-                        corrected += char
-                    elif is_last and char.isalpha():
-                        corrected += 'A' if char == '4' else char
-                    else:
-                        corrected += digit_map.get(char, char)
-                corrected_tokens.append(corrected)
-
-            elif i == 2:
-                norm = token.replace('5','S').replace('1','I').replace('0','O')
-                corrected_tokens.append('ISS' if norm in ['ISS','I55','IS5'] else token)
+            cv2.putText(preview, text_to_display, (x_center, y_top + text_height), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.4, (0, 255, 255), 1, cv2.LINE_AA)
 
-            else:
-                corrected_tokens.append(token)
-
-        return ' '.join(corrected_tokens)
+        self.update_signal.emit(PreviewFrame(preview))
 
     def _find_best_din_match(self, detected_text):
-        detected_corrected = self._correct_din_structure(detected_text)
+        return MATCH_CACHE.lookup(("DIN", detected_text), self._match_din_text, detected_text)
+
+    def _match_din_text(self, detected_text):
+        detected_corrected = correct("DIN", detected_text)
         detected_clean = detected_corrected.replace(' ', '').upper()
+        return DIN_MATCHER.match(detected_clean)
 
-        if len(detected_clean) < 2:
-            return None, 0.0
+    def _find_best_jis_match(self, detected_text):
+        return MATCH_CACHE.lookup(("JIS", detected_text), self._match_jis_text, detected_text)
 
-        best_match = None
-        best_score = 0.0
+    def _match_jis_text(self, detected_text):
+        detected_corrected = correct("JIS", detected_text)
+        detected_clean = detected_corrected.replace(' ', '').upper()
+        return JIS_MATCHER.match(detected_clean)
 
-        detected_no_iss = re.sub(r'\s*ISS$', '', detected_clean)
+    def _readtext_stage(self, stage_name, processed_frame, current_preset, allowlist_chars):
+        try:
+            return self.reader.readtext(
+                processed_frame,
+                detail=1,
+                paragraph=False,
+                min_size=8,
+                width_ths=0.5 if current_preset == "DIN" else 0.7,
+                allowlist=allowlist_chars,
+                decoder='greedy',
+                beamWidth=3,
+            )
+        except Exception as e:
+            print(f"OCR error on {stage_name}: {e}")
+            return []
 
-        is_reverse_pattern = bool(re.search(r'LN[0-6]$', detected_clean))
-        is_forward_pattern = bool(re.match(r'^LN[0-6]', detected_clean))
-        if len(detected_clean) <= 4:
-            adaptive_threshold = 0.75
-        elif is_reverse_pattern or is_forward_pattern:
-            adaptive_threshold = 0.70
-        else:
-            adaptive_threshold = 0.82
-
-        for din_type in DIN_TYPES[1:]:
-            target_clean = din_type.replace(' ', '').upper()
-
-            if detected_clean == target_clean:
-                return din_type, 1.0
-
-            ratio = SequenceMatcher(None, detected_clean, target_clean).ratio()
-            if ratio >= adaptive_threshold and ratio > best_score:
-                best_score = ratio
-                best_match = din_type
-
-            if ratio < 0.88:
-                target_no_iss = re.sub(r'ISS$', '', target_clean)
-                if detected_no_iss != detected_clean or target_no_iss != target_clean:
-                    ratio_no_iss = SequenceMatcher(None, detected_no_iss, target_no_iss).ratio()
-                    if ratio_no_iss >= 0.88 and ratio_no_iss > best_score:
-                        if 'ISS' in detected_clean and 'ISS' not in din_type:
-                            iss_candidate = din_type + ' ISS'
-                            if iss_candidate in DIN_TYPES:
-                                best_score = ratio_no_iss
-                                best_match = iss_candidate
-                        elif 'ISS' not in din_type:
-                            best_score = ratio_no_iss
-                            best_match = din_type
-
-        if not best_match and re.match(r'^(\d+)LN([0-6])$', detected_clean):
-            for din_type in DIN_TYPES[1:]:
-                if din_type.replace(' ', '').upper() == detected_clean:
-                    return din_type, 1.0
-
-        return best_match, best_score
-
-    def _correct_jis_structure(self, text):
-        text = text.strip().upper().replace(' ', '')
-
-        digit_to_letter = {
-            '0': 'D', '1': 'I', '2': 'Z', '3': 'B',
-            '4': 'A', '5': 'S', '6': 'G', '8': 'B',
+    def _read_stages_sequential(self, gray, clahe_frame, current_preset, allowlist_chars):
+        processing_stages = {
+            'Grayscale': gray,
+            'CLAHE':     clahe_frame,
         }
 
-        letter_to_digit = {
-            'O': '0', 'Q': '0',
-            'I': '1', 'L': '1',
-            'Z': '2',
-            'S': '5',
-            'G': '6',
-            'B': '8',
-        }
+        results = []
+        for stage_name, processed_frame in processing_stages.items():
+            results.extend(self._readtext_stage(stage_name, processed_frame, current_preset, allowlist_chars))
 
-        text = re.sub(r'\(5\)', r'(S)', text)
-        text = re.sub(r'5\)', r'(S)', text)
-        text = re.sub(r'\([S5](?!\))', r'(S)', text)
-
-        option = ''
-        main_text = text
-        if main_text.endswith('(S)'):
-            option = '(S)'
-            main_text = main_text[:-3]
-
-        terminal = ''
-        if main_text and main_text[-1] in ['L', 'R']:
-            terminal = main_text[-1]
-            main_text = main_text[:-1]
-
-        if len(main_text) >= 5:
-            for mid_pos in [2, 3]:
-                if mid_pos < len(main_text):
-                    potential_mid = main_text[mid_pos]
-
-                    if potential_mid in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']:
-                        raw_cap = main_text[:mid_pos]
-                        mid_char = potential_mid
-                        raw_size = main_text[mid_pos+1:]
-
-                        cap_corrected = ''.join(letter_to_digit.get(c, c) for c in raw_cap)
-                        size_corrected = ''.join(letter_to_digit.get(c, c) for c in raw_size)
-
-                        if cap_corrected.isdigit() and size_corrected.isdigit():
-                            return f'{cap_corrected}{mid_char}{size_corrected}{terminal}{option}'
-                        break
-
-                    elif potential_mid.isdigit():
-                        corrected_letter = digit_to_letter.get(potential_mid, 'D')
-                        if corrected_letter in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']:
-                            raw_cap = main_text[:mid_pos]
-                            mid_char = corrected_letter
-                            raw_size = main_text[mid_pos+1:]
-
-                            cap_corrected = ''.join(letter_to_digit.get(c, c) for c in raw_cap)
-                            size_corrected = ''.join(letter_to_digit.get(c, c) for c in raw_size)
-
-                            if cap_corrected.isdigit() and size_corrected.isdigit():
-                                return f'{cap_corrected}{mid_char}{size_corrected}{terminal}{option}'
-                            break
-
-        pattern = r'^(\d{2,3})([A-Z0-9])(\d{2,3})([LR])?(\(S\))?$'
-        match = re.match(pattern, text)
-        if match:
-            capacity = match.group(1)
-            middle_char = match.group(2)
-            size = match.group(3)
-            terminal = match.group(4) or ''
-            option = match.group(5) or ''
-
-            if middle_char.isdigit():
-                corrected_letter = digit_to_letter.get(middle_char, 'D')
-                if corrected_letter in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']:
-                    middle_char = corrected_letter
-
-            corrected = f"{capacity}{middle_char}{size}{terminal}{option}"
-            return corrected
-
-        return text
+            if results and max(r[2] for r in results) > 0.82:
+                break
 
-    def _find_best_jis_match(self, detected_text):
-        detected_corrected = self._correct_jis_structure(detected_text)
-        detected_clean = detected_corrected.replace(' ', '').upper()
+        return results
 
-        for jis_type in JIS_TYPES[1:]:
-            if detected_clean == jis_type.replace(' ', '').upper():
-                return jis_type, 1.0
+    def _read_stages_batched(self, gray, clahe_frame, current_preset, allowlist_chars):
+        #deteksi teks sekali di grayscale, lalu recognizer membaca crop grayscale dan CLAHE dari box yang sama
+        try:
+            horizontal_list, free_list = self.reader.detect(
+                gray,
+                min_size=8,
+                width_ths=0.5 if current_preset == "DIN" else 0.7,
+            )
+            horizontal_list, free_list = horizontal_list[0], free_list[0]
+        except Exception as e:
+            print(f"OCR error on detection: {e}")
+            return self._read_stages_sequential(gray, clahe_frame, current_preset, allowlist_chars)
 
-        best_match = None
-        best_score = 0.0
+        if not horizontal_list and not free_list:
+            return self._readtext_stage('CLAHE', clahe_frame, current_preset, allowlist_chars)
 
-        for jis_type in JIS_TYPES[1:]:
-            target_clean = jis_type.replace(' ', '').upper()
-            ratio = SequenceMatcher(None, detected_clean, target_clean).ratio()
+        return self._recognize_stages(gray, clahe_frame, horizontal_list, free_list, allowlist_chars)
 
-            if ratio > 0.85 and ratio > best_score:
-                best_score = ratio
-                best_match = jis_type
+    def _recognize_crops(self, stage_name, frame, horizontal_list, free_list, allowlist_chars):
+        try:
+            return self.reader.recognize(
+                frame,
+                horizontal_list,
+                free_list,
+                decoder='greedy',
+                beamWidth=3,
+                batch_size=len(horizontal_list) + len(free_list),
+                allowlist=allowlist_chars,
+                detail=1,
+                paragraph=False,
+            )
+        except Exception as e:
+            print(f"OCR error on {stage_name} recognition: {e}")
+            return []
+
+    def _recognize_stages(self, gray, clahe_frame, horizontal_list, free_list, allowlist_chars):
+        if self.stage_early_exit:
+            #crop CLAHE (box yang sama) hanya dibaca kalau hasil grayscale belum cukup yakin
+            gray_results = self._recognize_crops('Grayscale', gray, horizontal_list, free_list, allowlist_chars)
+            if gray_results and max(r[2] for r in gray_results) > 0.82:
+                return gray_results
+            return gray_results + self._recognize_crops('CLAHE', clahe_frame, horizontal_list, free_list, allowlist_chars)
+
+        #crop grayscale + CLAHE dibaca recognizer dalam satu batch (satu forward pass)
+        h = gray.shape[0]
+        stacked = np.vstack([gray, clahe_frame])
+
+        #potong box di batas gambar supaya crop grayscale tidak ikut mengambil area CLAHE
+        h_boxes = [[x_min, x_max, max(0, y_min), min(h, y_max)] for x_min, x_max, y_min, y_max in horizontal_list]
+        f_boxes = [[[x, min(max(y, 0), h)] for x, y in box] for box in free_list]
+        h_all = h_boxes + [[x_min, x_max, y_min + h, y_max + h] for x_min, x_max, y_min, y_max in h_boxes]
+        f_all = f_boxes + [[[x, y + h] for x, y in box] for box in f_boxes]
+
+        results = self._recognize_crops('batched', stacked, h_all, f_all, allowlist_chars)
+
+        gray_results = []
+        clahe_results = []
+        for bbox, text, confidence in results:
+            if min(p[1] for p in bbox) >= h:
+                clahe_results.append(([[x, y - h] for x, y in bbox], text, confidence))
+            else:
+                gray_results.append((bbox, text, confidence))
+
+        if gray_results and max(r[2] for r in gray_results) > 0.82:
+            return gray_results
+
+        return gray_results + clahe_results
+
+    def _group_adjacent(self, results_bbox, max_h_gap=60, max_v_diff=20):
+        if not results_bbox: return results_bbox
+        def bi(bbox):
+            xs=[p[0] for p in bbox]; ys=[p[1] for p in bbox]
+            return min(xs),min(ys),max(xs),max(ys)
+        items = sorted(results_bbox, key=lambda r: bi(r['bbox'])[0])
+        used = [False]*len(items); grouped = []
+        for i, item in enumerate(items):
+            if used[i]: continue
+            x1i,y1i,x2i,y2i = bi(item['bbox'])
+            texts=[item['text']]; confs=[item['confidence']]; used[i]=True
+            for j, other in enumerate(items):
+                if used[j] or i==j: continue
+                x1j,y1j,x2j,y2j = bi(other['bbox'])
+                cy_i=(y1i+y2i)/2; cy_j=(y1j+y2j)/2
+                if abs(cy_i-cy_j)>max_v_diff: continue
+                if 0<=x1j-x2i<=max_h_gap:
+                    texts.append(other['text']); confs.append(other['confidence'])
+                    used[j]=True; x2i=x2j
+            if len(texts)>1:
+                grouped.append({'text':' '.join(texts),'bbox':item['bbox'],
+                                'confidence':sum(confs)/len(confs)})
+            else:
+                grouped.append(item)
+        return grouped
+
+    def _collect_results(self, stage_results, scale_factor, current_preset):
+        all_results = []
+        all_results_with_bbox = []
+
+        for bbox, text, confidence in stage_results:
+            scaled_bbox = [[int(x / scale_factor), int(y / scale_factor)] for x, y in bbox]
+            all_results.append(text)
+            all_results_with_bbox.append({'text': text, 'bbox': scaled_bbox, 'confidence': confidence})
+
+        if current_preset == "DIN" and all_results_with_bbox:
+            grouped_results = self._group_adjacent(all_results_with_bbox)
+            for gr in grouped_results:
+                if ' ' in gr['text'] and gr['text'] not in all_results:
+                    all_results.append(gr['text'])
+                    all_results_with_bbox.append(gr)
+
+        return all_results, all_results_with_bbox
+
+    def _select_best_match(self, current_preset, all_results_with_bbox):
+        best_match_text = None
+        best_match_score = 0.0
+        best_match_bbox = None
+
+        if current_preset == "DIN":
+            for result_data in all_results_with_bbox:
+                text = result_data['text']
+                bbox = result_data['bbox']
 
-        if not best_match or best_score < 0.90:
-            detected_without_s = detected_clean.replace('(S)', '')
+                if len(text.replace(' ', '')) < 3:
+                    continue
 
-            for jis_type in JIS_TYPES[1:]:
-                target_without_s = jis_type.replace(' ', '').replace('(S)', '').upper()
-                ratio = SequenceMatcher(None, detected_without_s, target_without_s).ratio()
+                matched_type, score = self._find_best_din_match(text)
 
-                if ratio > 0.90:
-                    if '(S)' in detected_clean:
-                        base_code = jis_type.replace('(S)', '')
-                        candidate_with_s = base_code + '(S)'
+                if matched_type and score > best_match_score:
+                    best_match_score = score
+                    best_match_text = matched_type
+                    best_match_bbox = bbox
 
-                        if candidate_with_s in JIS_TYPES:
-                            best_match = candidate_with_s
-                            best_score = ratio
-                            break
-                    else:
-                        if '(S)' not in jis_type and ratio > best_score:
-                            best_match = jis_type
-                            best_score = ratio
+        else:
+            for result_data in all_results_with_bbox:
+                text = result_data['text']
+                bbox = result_data['bbox']
+
+                if len(text.replace(' ', '').replace('(S)', '')) < 5:
+                    continue
+
+                matched_type, score = self._find_best_jis_match(text)
 
-        return best_match, best_score
+                if matched_type and score > best_match_score:
+                    best_match_score = score
+                    best_match_text = matched_type
+                    best_match_bbox = bbox
+
+        if best_match_text and best_match_score > 0.85:
+            return best_match_text, best_match_bbox
+
+        return None, best_match_bbox
+
+    def _current_roi(self, roi_key):
+        with self._roi_lock:
+            if self._roi_box is None or self._roi_key != roi_key:
+                return None
+            return list(self._roi_box)
+
+    def _record_roi_hit(self, hit):
+        with self._roi_lock:
+            if hit:
+                self.roi_hits += 1
+                self._roi_miss_streak = 0
+            else:
+                self.roi_misses += 1
+
+    def _update_roi(self, roi_key, bbox, scale_factor, gray_shape):
+        if bbox is None:
+            with self._roi_lock:
+                self._roi_miss_streak += 1
+                if self._roi_miss_streak >= ROI_MAX_MISSES:
+                    self._roi_box = None
+                    self._roi_key = None
+            return
+
+        #bbox dalam koordinat crop, kembalikan ke koordinat frame kecil (480px) lalu beri padding
+        xs = [p[0] * scale_factor for p in bbox]
+        ys = [p[1] * scale_factor for p in bbox]
+        x_min, x_max, y_min, y_max = min(xs), max(xs), min(ys), max(ys)
+        pad = max(ROI_MIN_PADDING, (y_max - y_min) * ROI_PADDING)
+
+        h, w = gray_shape[:2]
+        roi_box = [
+            max(0, int(x_min - pad)), min(w, int(x_max + pad)),
+            max(0, int(y_min - pad)), min(h, int(y_max + pad)),
+        ]
+        with self._roi_lock:
+            self._roi_box = roi_box
+            self._roi_key = roi_key
+            self._roi_miss_streak = 0
 
     def scan_frame(self, frame, is_static=False, original_frame=None):
         current_preset = self.preset
@@ -563,9 +557,6 @@ class DetectionLogic(threading.Thread):
         frame_to_save = original_frame if original_frame is not None else frame
 
         if not is_static:
-            if not self.scan_lock.acquire(blocking=False):
-                return
-
             h_orig, w_orig, _ = frame.shape
             min_dim_orig = min(h_orig, w_orig)
             start_x_orig = (w_orig - min_dim_orig) // 2
@@ -575,25 +566,6 @@ class DetectionLogic(threading.Thread):
             if self.edge_mode:
                 frame = apply_edge_detection(frame)
 
-            if self.split_mode:
-                TARGET_CONTENT_SIZE = self.TARGET_HEIGHT // 2
-                frame_scaled_320 = cv2.resize(frame, (TARGET_CONTENT_SIZE, TARGET_CONTENT_SIZE), interpolation=cv2.INTER_AREA)
-
-                frame_top_edge = apply_edge_detection(frame_scaled_320.copy())
-                frame_bottom_original = frame_scaled_320.copy()
-
-                canvas_top = np.zeros((TARGET_CONTENT_SIZE, self.TARGET_WIDTH, 3), dtype=np.uint8)
-                canvas_bottom = np.zeros((TARGET_CONTENT_SIZE, self.TARGET_WIDTH, 3), dtype=np.uint8)
-
-                x_offset = (self.TARGET_WIDTH - TARGET_CONTENT_SIZE) // 2
-
-                canvas_top[:, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_top_edge
-                canvas_bottom[:, x_offset:x_offset + TARGET_CONTENT_SIZE] = frame_bottom_original
-
-                frame_combined = np.vstack([canvas_top, canvas_bottom])
-                frame_rgb = cv2.cvtColor(frame_combined, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-
         try:
             h, w = frame.shape[:2]
             scale_factor = 1.0
@@ -607,126 +579,39 @@ class DetectionLogic(threading.Thread):
             gray = cv2.cvtColor(frame_small, cv2.COLOR_BGR2GRAY)
 
             clahe_frame = self._clahe.apply(gray)
-            processing_stages = {
-                'Grayscale': gray,
-                'CLAHE':     clahe_frame,
-            }
-
-            all_results = []
-            all_results_with_bbox = []
 
             if current_preset == "JIS":
                 allowlist_chars = ALLOWLIST_JIS
             else:
                 allowlist_chars = ALLOWLIST_DIN
 
-            for stage_name, processed_frame in processing_stages.items():
-                try:
-                    min_sz = 8
-                    w_ths = 0.5 if current_preset == "DIN" else 0.7
-
-                    results = self.reader.readtext(
-                        processed_frame,
-                        detail=1,
-                        paragraph=False,
-                        min_size=min_sz,
-                        width_ths=w_ths,
-                        allowlist=allowlist_chars,
-                        decoder='greedy',
-                        beamWidth=3,
-                    )
-
-                    stage_scale = scale_factor
-
-                    for result in results:
-                        bbox, text, confidence = result
-                        scaled_bbox = [[int(x / stage_scale), int(y / stage_scale)] for x, y in bbox]
-                        all_results.append(text)
-                        all_results_with_bbox.append({'text': text, 'bbox': scaled_bbox, 'confidence': confidence})
-
-                    if all_results_with_bbox:
-                        best_conf = max(r['confidence'] for r in all_results_with_bbox)
-                        if best_conf > 0.82:
-                            break
-
-                except Exception as e:
-                    print(f"OCR error on {stage_name}: {e}")
-                    continue
-
-            if current_preset == "DIN" and all_results_with_bbox:
-                def _group_adjacent(results_bbox, max_h_gap=60, max_v_diff=20):
-                    if not results_bbox: return results_bbox
-                    def bi(bbox):
-                        xs=[p[0] for p in bbox]; ys=[p[1] for p in bbox]
-                        return min(xs),min(ys),max(xs),max(ys)
-                    items = sorted(results_bbox, key=lambda r: bi(r['bbox'])[0])
-                    used = [False]*len(items); grouped = []
-                    for i, item in enumerate(items):
-                        if used[i]: continue
-                        x1i,y1i,x2i,y2i = bi(item['bbox'])
-                        texts=[item['text']]; confs=[item['confidence']]; used[i]=True
-                        for j, other in enumerate(items):
-                            if used[j] or i==j: continue
-                            x1j,y1j,x2j,y2j = bi(other['bbox'])
-                            cy_i=(y1i+y2i)/2; cy_j=(y1j+y2j)/2
-                            if abs(cy_i-cy_j)>max_v_diff: continue
-                            if 0<=x1j-x2i<=max_h_gap:
-                                texts.append(other['text']); confs.append(other['confidence'])
-                                used[j]=True; x2i=x2j
-                        if len(texts)>1:
-                            grouped.append({'text':' '.join(texts),'bbox':item['bbox'],
-                                            'confidence':sum(confs)/len(confs)})
-                        else:
-                            grouped.append(item)
-                    return grouped
-                grouped_results = _group_adjacent(all_results_with_bbox)
-                for gr in grouped_results:
-                    if ' ' in gr['text'] and gr['text'] not in all_results:
-                        all_results.append(gr['text'])
-                        all_results_with_bbox.append(gr)
-
-            if self.all_text_signal:
-                unique_results = list(set(all_results))
-                self.all_text_signal.emit(unique_results)
-
-            best_match_text = None
-            best_match_score = 0.0
-
-            if current_preset == "DIN":
-                for result_data in all_results_with_bbox:
-                    text = result_data['text']
-                    bbox = result_data['bbox']
-
-                    if len(text.replace(' ', '')) < 3:
-                        continue
-
-                    matched_type, score = self._find_best_din_match(text)
+            roi_key = (gray.shape, current_preset, self.edge_mode, self.split_mode)
+            used_roi = False
 
-                    if matched_type and score > best_match_score:
-                        best_match_score = score
-                        best_match_text = matched_type
-                        best_match_bbox = bbox
+            roi_box = None if is_static else self._current_roi(roi_key)
+            if roi_box is not None:
+                stage_results = self._recognize_stages(gray, clahe_frame, [roi_box], [], allowlist_chars)
+                all_results, all_results_with_bbox = self._collect_results(stage_results, scale_factor, current_preset)
+                best_match, best_match_bbox = self._select_best_match(current_preset, all_results_with_bbox)
 
-                if best_match_text and best_match_score > 0.85:
-                    best_match = best_match_text
+                used_roi = bool(best_match)
+                self._record_roi_hit(used_roi)
 
-            else:
-                for result_data in all_results_with_bbox:
-                    text = result_data['text']
-                    bbox = result_data['bbox']
-
-                    if len(text.replace(' ', '').replace('(S)', '')) < 5:
-                        continue
+            if not used_roi:
+                if self.batch_stages:
+                    stage_results = self._read_stages_batched(gray, clahe_frame, current_preset, allowlist_chars)
+                else:
+                    stage_results = self._read_stages_sequential(gray, clahe_frame, current_preset, allowlist_chars)
 
-                    matched_type, score = self._find_best_jis_match(text)
+                all_results, all_results_with_bbox = self._collect_results(stage_results, scale_factor, current_preset)
+                best_match, best_match_bbox = self._select_best_match(current_preset, all_results_with_bbox)
 
-                    if matched_type and score > best_match_score:
-                        best_match_score = score
-                        best_match_text = matched_type
-                        best_match_bbox = bbox
+            if not used_roi and not is_static:
+                self._update_roi(roi_key, best_match_bbox if best_match else None, scale_factor, gray.shape)
 
-                if best_match_text and best_match_score > 0.85:
-                    best_match = best_match_text
+            if self.all_text_signal:
+                unique_results = list(set(all_results))
+                self.all_text_signal.emit(unique_results)
 
             if best_match:
                 detected_code = best_match.strip()
@@ -736,29 +621,25 @@ class DetectionLogic(threading.Thread):
                 self.bbox_timestamp = time.time()
 
                 if current_preset == "DIN":
-                    detected_code = self._normalize_din_code(detected_code)
+                    detected_code = normalize_din_code(detected_code)
                 else:
                     detected_code = detected_code.replace(' ', '')
 
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                detected_type = self._detect_code_type(detected_code)
+                detected_type = detect_code_type(detected_code)
 
                 if detected_type is None:
                     self.code_detected_signal.emit("Format kode tidak valid")
-                    if not is_static:
-                        self.scan_lock.release()
                     return
                 if detected_type != current_preset:
                     msg = "Pastikan foto anda adalah Type JIS" if current_preset == "JIS" else "Pastikan foto anda adalah Type DIN"
                     self.code_detected_signal.emit(msg)
-                    if not is_static:
-                        self.scan_lock.release()
                     return
 
                 if current_preset == "DIN":
                     target_for_compare = getattr(self, 'target_label_compare', current_target_label)
-                    target_normalized = self._normalize_din_code(target_for_compare)
-                    detected_normalized = self._normalize_din_code(detected_code)
+                    target_normalized = normalize_din_code(target_for_compare)
+                    detected_normalized = normalize_din_code(detected_code)
                     status = "OK" if detected_normalized.upper() == target_normalized.upper() else "Not OK"
                 else:
                     target_for_compare = getattr(self, 'target_label_compare', current_target_label)
@@ -766,37 +647,26 @@ class DetectionLogic(threading.Thread):
 
                 target_session = current_target_label if current_target_label else detected_code
 
-                if not is_static:
-                    if any(rec["Code"] == detected_code and
-                            (datetime.now() - datetime.strptime(rec["Time"], "%Y-%m-%d %H:%M:%S")).total_seconds() < 5
-                            for rec in self.detected_codes):
+                with self.scan_lock:
+                    if not is_static and self._is_recent_duplicate(detected_code):
                         return
 
-                img_filename = f"karton_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                img_path = os.path.join(IMAGE_DIR, img_filename)
-
-                if best_match_bbox is not None:
-                    frame_with_box = self._draw_bounding_box(frame_to_save, best_match_bbox, detected_code)
-                    frame_binary = convert_frame_to_binary(frame_with_box)
-                else:
-                    frame_binary = convert_frame_to_binary(frame_to_save)
-
-                cv2.imwrite(img_path, frame_binary)
+                    img_filename = f"karton_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+                    img_path = os.path.join(image_dir_for(datetime.now()), img_filename)
 
-                new_id = insert_detection(timestamp, detected_code, current_preset, img_path, status, target_session)
+                    if best_match_bbox is not None:
+                        frame_with_box = self._draw_bounding_box(frame_to_save, best_match_bbox, detected_code)
+                        frame_binary = convert_frame_to_binary(frame_with_box)
+                    else:
+                        frame_binary = convert_frame_to_binary(frame_to_save)
 
-                if new_id:
-                    record = {
-                        "ID": new_id,
-                        "Time": timestamp,
-                        "Code": detected_code,
-                        "Type": current_preset,
-                        "ImagePath": img_path,
-                        "Status": status,
-                        "TargetSession": target_session
-                    }
+                    #gambar dan baris database ditulis oleh writer di belakang, ID sudah tersedia sekarang
+                    record = self.writer.submit(timestamp, detected_code, current_preset, img_path, status,
+                                                target_session, image=frame_binary)
 
                     self.detected_codes.append(record)
+                    self._last_seen[detected_code] = time.monotonic()
+                    DETECTION_STATS.add_records([record])
 
                 self.code_detected_signal.emit(detected_code)
 
@@ -817,10 +687,6 @@ class DetectionLogic(threading.Thread):
             if is_static:
                 self.code_detected_signal.emit(f"ERROR: {e}")
 
-        finally:
-            if not is_static:
-                self.scan_lock.release()
-
     def start_detection(self):
         if self.running:
             return
@@ -829,9 +695,13 @@ class DetectionLogic(threading.Thread):
 
     def stop_detection(self):
         self.running = False
+        self.ocr_pool.stop()
 
         self.last_detected_bbox = None
         self.last_detected_code = None
+        with self._roi_lock:
+            self._roi_box = None
+            self._roi_key = None
 
         if self.cap:
             self.cap.release()
@@ -846,6 +716,7 @@ class DetectionLogic(threading.Thread):
 
     def set_target_label(self, label):
         self.target_label = label
+        self.frame_gate.reset()
 
         match = re.search(r'(\d{2,3}[A-H]\d{2,3}[LR]?(?:\(S\))?)', label)
         self.target_label_compare = match.group(1) if match else label
@@ -856,8 +727,7 @@ class DetectionLogic(threading.Thread):
 
         if new_date > self.current_date:
             self.current_date = new_date
-            self.detected_codes = []
-            self.detected_codes = load_existing_data(self.current_date)
+            self.set_detected_codes(load_existing_data(self.current_date))
             self.data_reset_signal.emit()
 
             return True
@@ -875,10 +745,7 @@ class DetectionLogic(threading.Thread):
 
             self._process_and_send_frame(frame, is_static=True)
 
-            threading.Thread(target=self.scan_frame,
-                            args=(frame.copy(),),
-                            kwargs={'is_static': True, 'original_frame': frame.copy()},
-                            daemon=True).start()
+            self.ocr_pool.submit(frame, copy=False, is_static=True)
 
             return "SCANNING"
 
@@ -886,28 +753,37 @@ class DetectionLogic(threading.Thread):
             print(f"File scan error: {e}")
             return f"PROCESS_ERROR: {e}"
 
-    def _detect_code_type(self, code):
-        code_normalized = code.replace(' ', '').upper()
+    def set_detected_codes(self, records):
+        with self.scan_lock:
+            self.detected_codes = records
+            self._rebuild_dedup_index()
 
-        if re.match(r"^\d{2,3}[A-H]\d{2,3}[LR]?(?:\(S\))?$", code_normalized):
-            return "JIS"
+    def discard_records(self, record_ids):
+        record_ids = set(record_ids)
+        with self.scan_lock:
+            self.detected_codes = [rec for rec in self.detected_codes if rec['ID'] not in record_ids]
+            self._rebuild_dedup_index()
+        DETECTION_STATS.invalidate()
 
-        for din_type in DIN_TYPES[1:]:
-            if code_normalized == din_type.replace(' ', '').upper():
-                return "DIN"
+    def _rebuild_dedup_index(self):
+        #waktu terakhir tiap kode dalam detik monotonic, hanya record di dalam window yang perlu dibaca
+        self._last_seen = {}
+        now_wall = datetime.now()
+        now_mono = time.monotonic()
 
-        din_patterns = [
-            r'^LBN\d$',
-            r'^LN[0-6]$',
-            r'^LN[0-6]\d{2,5}[A-Z]?$',
-            r'^LN[0-6]\d{2,5}[A-Z]ISS$',
-            r'^\d{2,5}LN[0-6]$',
-        ]
-        for pattern in din_patterns:
-            if re.match(pattern, code_normalized):
-                return "DIN"
+        #record terurut berdasarkan waktu, berhenti saat sudah di luar window
+        for rec in reversed(self.detected_codes):
+            try:
+                age = (now_wall - datetime.strptime(rec["Time"], "%Y-%m-%d %H:%M:%S")).total_seconds()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if age >= self.dedup_window:
+                break
+            self._last_seen.setdefault(rec["Code"], now_mono - age)
 
-        return None
+    def _is_recent_duplicate(self, code):
+        last_seen = self._last_seen.get(code)
+        return last_seen is not None and time.monotonic() - last_seen < self.dedup_window
 
     def _validate_preset_match(self, detected_code, detected_type):
         if detected_type is None:
@@ -924,7 +800,7 @@ class DetectionLogic(threading.Thread):
         from database import delete_codes
 
         if delete_codes(record_ids):
-            self.detected_codes = [rec for rec in self.detected_codes if rec['ID'] not in record_ids]
+            self.discard_records(record_ids)
             return True
 
         return False
\ No newline at end of file
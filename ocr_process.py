@@ -0,0 +1,173 @@
+import os
+import sys
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from config import OCR_PROCESSES
+
+_worker_reader = None
+
+def _init_worker(threads_per_process):
+    global _worker_reader
+    import easyocr
+
+    try:
+        import torch
+        torch.set_num_threads(threads_per_process)
+        _gpu = torch.cuda.is_available()
+    except ImportError:
+        _gpu = False
+
+    _worker_reader = easyocr.Reader(['en'], gpu=_gpu, verbose=False)
+
+def _attach_shared_memory(name):
+    #blok shared memory milik proses utama, worker hanya meminjam
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return tuple(_to_builtin(v) for v in value)
+    if isinstance(value, list):
+        return [_to_builtin(v) for v in value]
+    return value
+
+def _run_in_worker(method, shm_name, shape, dtype, args, kwargs):
+    shm = _attach_shared_memory(shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+    result = getattr(_worker_reader, method)(image, *args, **kwargs)
+    return _to_builtin(result)
+
+def _spawn_pool(ctx, processes, initargs):
+    #proses spawn menjalankan ulang modul __main__ (app.py / main.py) sebelum worker dimulai;
+    #selama pool dibuat __main__ diganti modul ini, jadi worker hanya memuat ocr_process tanpa Flask, Qt atau database
+    main_module = sys.modules.get('__main__')
+    sys.modules['__main__'] = sys.modules[__name__]
+    try:
+        return ctx.Pool(processes, initializer=_init_worker, initargs=initargs)
+    finally:
+        if main_module is not None:
+            sys.modules['__main__'] = main_module
+
+def _default_process_count():
+    cpu = os.cpu_count() or 2
+    return max(1, cpu // 2)
+
+class ProcessReader:
+    #pengganti easyocr.Reader yang menjalankan OCR di beberapa proses terpisah
+
+    def __init__(self, processes=OCR_PROCESSES):
+        self.processes = processes if processes and processes > 0 else _default_process_count()
+        threads_per_process = max(1, (os.cpu_count() or self.processes) // self.processes)
+
+        #spawn, karena fork setelah torch dimuat tidak aman
+        ctx = mp.get_context('spawn')
+        self._pool = _spawn_pool(ctx, self.processes, (threads_per_process,))
+
+        self._slots = queue.Queue()
+        self._all_slots = []
+        self._slots_lock = threading.Lock()
+        for _ in range(self.processes * 2):
+            self._slots.put(None)
+
+        self.closed = False
+
+    def _slot_for(self, nbytes, shm):
+        if shm is not None and shm.size >= nbytes:
+            return shm
+
+        with self._slots_lock:
+            if shm is not None:
+                self._all_slots.remove(shm)
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+            self._all_slots.append(shm)
+        return shm
+
+    def _call(self, method, image, *args, **kwargs):
+        if self.closed:
+            raise RuntimeError("ProcessReader sudah ditutup")
+
+        image = np.ascontiguousarray(image)
+        shm = self._slots.get()
+        try:
+            shm = self._slot_for(image.nbytes, shm)
+            view = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+            view[...] = image
+            del view
+
+            return self._pool.apply(
+                _run_in_worker,
+                (method, shm.name, image.shape, image.dtype.str, args, kwargs)
+            )
+        finally:
+            self._slots.put(shm)
+
+    def readtext(self, image, **kwargs):
+        return self._call('readtext', image, **kwargs)
+
+    def detect(self, image, **kwargs):
+        return self._call('detect', image, **kwargs)
+
+    def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, **kwargs):
+        return self._call('recognize', img_cv_grey, horizontal_list, free_list, **kwargs)
+
+    def warmup(self):
+        #pastikan semua proses sudah memuat model sebelum kamera dimulai
+        dummy = np.zeros((32, 128, 3), dtype=np.uint8)
+        pending = [
+            threading.Thread(target=self._warmup_one, args=(dummy,), daemon=True)
+            for _ in range(self.processes)
+        ]
+        for t in pending:
+            t.start()
+        for t in pending:
+            t.join()
+
+    def _warmup_one(self, dummy):
+        try:
+            self.readtext(dummy, detail=0)
+        except Exception:
+            pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        self._pool.terminate()
+        self._pool.join()
+
+        with self._slots_lock:
+            for shm in self._all_slots:
+                try:
+                    shm.close()
+                    shm.unlink()
+                except Exception:
+                    pass
+            self._all_slots = []
+
+_shared_reader = None
+_shared_lock = threading.Lock()
+
+def get_process_reader():
+    global _shared_reader
+    with _shared_lock:
+        if _shared_reader is None or _shared_reader.closed:
+            import atexit
+            _shared_reader = ProcessReader()
+            atexit.register(_shared_reader.close)
+        return _shared_reader
@@ -0,0 +1,142 @@
+import threading
+from collections import deque
+import numpy as np
+from config import OCR_WORKERS, OCR_QUEUE_SIZE
+
+class OcrWorkerPool:
+    #worker OCR permanen dengan antrian terbatas, job terlama dibuang saat penuh
+
+    def __init__(self, handler, workers=OCR_WORKERS, max_queue=OCR_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+
+        self._jobs = deque()
+        self._free_buffers = []
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._generation = 0
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy = 0
+        self.max_depth_seen = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._generation += 1
+            threads = [
+                threading.Thread(target=self._worker, args=(self._generation,), daemon=True)
+                for _ in range(self.workers)
+            ]
+            self._threads = threads
+
+        for t in threads:
+            t.start()
+
+    def stop(self, wait=False):
+        with self._cond:
+            self._running = False
+            while self._jobs:
+                frame, _, owned = self._jobs.popleft()
+                if owned:
+                    self._free_buffers.append(frame)
+            self._cond.notify_all()
+            threads = self._threads
+            self._threads = []
+
+        if wait:
+            for t in threads:
+                t.join(timeout=5.0)
+
+    def acquire_buffer(self, frame):
+        with self._cond:
+            while self._free_buffers:
+                buf = self._free_buffers.pop()
+                if buf.shape == frame.shape and buf.dtype == frame.dtype:
+                    return buf
+        return np.empty_like(frame)
+
+    def release_buffer(self, buf):
+        with self._cond:
+            if len(self._free_buffers) < self.workers + self.max_queue:
+                self._free_buffers.append(buf)
+
+    def submit(self, frame, copy=True, **kwargs):
+        if copy:
+            buf = self.acquire_buffer(frame)
+            np.copyto(buf, frame)
+            self._enqueue(buf, kwargs, True)
+        else:
+            self._enqueue(frame, kwargs, False)
+
+    def submit_buffer(self, buf, **kwargs):
+        #buf berasal dari acquire_buffer dan dikembalikan ke pool setelah selesai
+        self._enqueue(buf, kwargs, True)
+
+    def _enqueue(self, buf, kwargs, owned):
+        self.start()
+
+        with self._cond:
+            while len(self._jobs) >= self.max_queue:
+                old_frame, _, old_owned = self._jobs.popleft()
+                self.dropped += 1
+                if old_owned and len(self._free_buffers) < self.workers + self.max_queue:
+                    self._free_buffers.append(old_frame)
+
+            self._jobs.append((buf, kwargs, owned))
+            self.submitted += 1
+            self.max_depth_seen = max(self.max_depth_seen, len(self._jobs))
+            self._cond.notify()
+
+    def _worker(self, generation):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or not self._running or self._generation != generation)
+                if not self._running or self._generation != generation:
+                    return
+                frame, kwargs, owned = self._jobs.popleft()
+                self.busy += 1
+
+            failed = False
+            try:
+                self.handler(frame, **kwargs)
+            except Exception as e:
+                failed = True
+                print(f"[OCR worker] error: {e}")
+            finally:
+                with self._cond:
+                    self.busy -= 1
+                    self.processed += 1
+                    if failed:
+                        self.failed += 1
+                if owned:
+                    self.release_buffer(frame)
+
+    def idle_workers(self):
+        with self._cond:
+            return self.workers - self.busy - len(self._jobs)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'queue_depth': len(self._jobs),
+                'max_queue': self.max_queue,
+                'max_depth_seen': self.max_depth_seen,
+                'busy': self.busy,
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
@@ -0,0 +1,236 @@
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from config import IMAGE_DIR, ARCHIVE_DIR, ARCHIVE_KEEP_MONTHS, ROLLOVER_INTERVAL
+from database import open_connection, month_bounds
+
+#bulan yang sudah ditutup dipindah ke archive/detection_YYYY_MM.db, detection.db hanya menyimpan bulan berjalan
+_ARCHIVE_NAME = re.compile(r'^detection_(\d{4})_(\d{2})\.db$')
+_COLUMNS = "id, timestamp, code, preset, image_path, status, target_session"
+
+def image_dir_for(moment):
+    return os.path.join(IMAGE_DIR, moment.strftime('%Y'), moment.strftime('%m'), moment.strftime('%d'))
+
+def archive_path(year, month):
+    return os.path.join(ARCHIVE_DIR, f"detection_{year}_{month:02d}.db")
+
+def list_archives():
+    #[(year, month, path)] terurut dari bulan terlama
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+
+    archives = []
+    for name in os.listdir(ARCHIVE_DIR):
+        match = _ARCHIVE_NAME.match(name)
+        if match:
+            archives.append((int(match.group(1)), int(match.group(2)), os.path.join(ARCHIVE_DIR, name)))
+    return sorted(archives)
+
+def archives_for_range(start=None, end=None):
+    #start/end berupa string timestamp 'YYYY-MM-DD ...', None berarti tidak dibatasi
+    start_key = start[:7] if start else None
+    end_key = end[:7] if end else None
+
+    paths = []
+    for year, month, path in list_archives():
+        key = f"{year}-{month:02d}"
+        if start_key and key < start_key:
+            continue
+        if end_key and key > end_key:
+            continue
+        paths.append(path)
+    return paths
+
+def open_archive(path):
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False)
+
+def total_detection_count():
+    from database import get_detection_count
+    total = get_detection_count()
+    for _, _, path in list_archives():
+        try:
+            conn = open_archive(path)
+            try:
+                total += conn.execute("SELECT COUNT(*) FROM detected_codes").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[archive] Gagal membaca {path}: {e}")
+    return total
+
+def _create_archive_schema(conn, alias):
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS {alias}.detected_codes (
+                        id INTEGER PRIMARY KEY,
+                        timestamp TEXT,
+                        code TEXT,
+                        preset TEXT,
+                        image_path TEXT,
+                        status TEXT,
+                        target_session TEXT
+                    )''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_detected_codes_timestamp ON detected_codes (timestamp)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_detected_codes_preset_session ON detected_codes (preset, target_session, timestamp)")
+
+def _relocate_images(conn, start, end):
+    #gambar lama di images/ (flat) dipindah ke images/YYYY/MM/DD sebelum diarsipkan
+    rows = conn.execute(
+        "SELECT id, timestamp, image_path FROM main.detected_codes WHERE timestamp >= ? AND timestamp < ?",
+        (start, end)
+    ).fetchall()
+
+    updates = []
+    for record_id, timestamp, image_path in rows:
+        if not image_path or os.path.dirname(os.path.normpath(image_path)) != os.path.normpath(IMAGE_DIR):
+            continue
+        try:
+            moment = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            continue
+
+        target = os.path.join(image_dir_for(moment), os.path.basename(image_path))
+        try:
+            if os.path.exists(image_path):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(image_path, target)
+            elif not os.path.exists(target):
+                continue
+        except OSError as e:
+            print(f"[archive] Gagal memindah {image_path}: {e}")
+            continue
+        updates.append((target, record_id))
+
+    if updates:
+        conn.executemany("UPDATE main.detected_codes SET image_path = ? WHERE id = ?", updates)
+        conn.commit()
+
+def archive_month(year, month):
+    start, end = month_bounds(year, month)
+    path = archive_path(year, month)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    conn = open_connection()
+    try:
+        _relocate_images(conn, start, end)
+
+        conn.execute("ATTACH DATABASE ? AS arc", (path,))
+        try:
+            _create_archive_schema(conn, "arc")
+            #commit yang menyentuh beberapa database tidak atomik di mode WAL, jadi dipisah:
+            #1. salin ke arsip lalu commit (INSERT OR IGNORE: aman diulang jika proses sebelumnya terhenti)
+            conn.execute(
+                f"INSERT OR IGNORE INTO arc.detected_codes ({_COLUMNS}) "
+                f"SELECT {_COLUMNS} FROM main.detected_codes WHERE timestamp >= ? AND timestamp < ?",
+                (start, end)
+            )
+            conn.commit()
+
+            #2. pastikan semua id bulan ini sudah ada di arsip
+            missing = conn.execute(
+                "SELECT COUNT(*) FROM main.detected_codes m WHERE m.timestamp >= ? AND m.timestamp < ? "
+                "AND NOT EXISTS (SELECT 1 FROM arc.detected_codes a WHERE a.id = m.id)",
+                (start, end)
+            ).fetchone()[0]
+            if missing:
+                raise RuntimeError(f"{missing} baris {year}-{month:02d} belum ada di arsip, detection.db tidak dihapus")
+
+            #3. baru hapus dari detection.db dalam transaksi sendiri, hanya id yang sudah ada di arsip
+            moved = conn.execute(
+                "DELETE FROM main.detected_codes WHERE timestamp >= ? AND timestamp < ? "
+                "AND id IN (SELECT id FROM arc.detected_codes)",
+                (start, end)
+            ).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE arc")
+    finally:
+        conn.close()
+
+    archive = sqlite3.connect(path)
+    try:
+        archive.execute("VACUUM")
+    finally:
+        archive.close()
+
+    return moved
+
+def _closed_months(now):
+    #bulan di detection.db yang lebih lama dari ARCHIVE_KEEP_MONTHS bulan terakhir
+    keep = max(1, int(ARCHIVE_KEEP_MONTHS))
+    year, month = now.year, now.month - (keep - 1)
+    while month < 1:
+        month += 12
+        year -= 1
+    cutoff, _ = month_bounds(year, month)
+
+    conn = open_connection()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM detected_codes WHERE timestamp < ? ORDER BY 1",
+            (cutoff,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    months = []
+    for (key,) in rows:
+        try:
+            months.append((int(key[:4]), int(key[5:7])))
+        except (TypeError, ValueError):
+            continue
+    return months
+
+def rollover(now=None):
+    now = now or datetime.now()
+    total = 0
+
+    for year, month in _closed_months(now):
+        try:
+            moved = archive_month(year, month)
+            total += moved
+            print(f"[archive] {year}-{month:02d}: {moved} record dipindah ke {archive_path(year, month)}")
+        except Exception as e:
+            print(f"[archive] Gagal mengarsipkan {year}-{month:02d}: {e}")
+
+    if total:
+        #kecilkan detection.db setelah data bulan lama keluar
+        conn = open_connection()
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            print(f"[archive] VACUUM dilewati: {e}")
+        finally:
+            conn.close()
+
+    return total
+
+_rollover_thread = None
+_rollover_lock = threading.Lock()
+
+def start_rollover_job(interval=ROLLOVER_INTERVAL):
+    global _rollover_thread
+    with _rollover_lock:
+        if _rollover_thread is not None:
+            return _rollover_thread
+
+        stop = threading.Event()
+
+        def loop():
+            while True:
+                try:
+                    rollover()
+                except Exception as e:
+                    print(f"[archive] Error rollover: {e}")
+                if stop.wait(interval):
+                    return
+
+        _rollover_thread = threading.Thread(target=loop, name="ArchiveRollover", daemon=True)
+        _rollover_thread.stop = stop
+        _rollover_thread.start()
+        return _rollover_thread
@@ -0,0 +1,289 @@
+import os
+import json
+import threading
+import atexit
+import time
+from collections import deque
+import cv2
+from config import (
+    DB_FILE, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL, WRITE_ID_BLOCK, WRITE_FSYNC, WRITE_MAX_RETRIES,
+    WRITE_DEAD_LETTER_FILE
+)
+from database import open_connection, reserve_ids, insert_records, set_pending_writes_hook
+
+class DetectionWriter:
+    #simpan deteksi (gambar + baris database) di thread terpisah, ID langsung diberikan saat submit
+
+    def __init__(self, db_file=DB_FILE, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                 id_block=WRITE_ID_BLOCK, fsync=WRITE_FSYNC, max_retries=WRITE_MAX_RETRIES,
+                 dead_letter_file=WRITE_DEAD_LETTER_FILE):
+        self.db_file = db_file
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.id_block = max(1, int(id_block))
+        self.fsync = fsync
+        self.max_retries = max(0, int(max_retries))
+        self.dead_letter_file = dead_letter_file
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._last_id = -1
+        self._listeners = []
+
+        self._conn = None
+        self._thread = None
+        self._running = False
+        self._in_flight = 0
+        self._submitted_seq = 0
+        self._written_seq = 0
+
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.missing_images = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="DetectionWriter", daemon=True)
+            self._thread.start()
+
+    def add_listener(self, callback):
+        #callback(records) dipanggil di thread writer setelah batch tersimpan
+        self._listeners.append(callback)
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = open_connection(self.db_file)
+            if self.fsync:
+                #satu fsync per batch: baris yang sudah commit tetap ada walau listrik mati
+                self._conn.execute("PRAGMA synchronous=FULL")
+        return self._conn
+
+    def _allocate_id(self):
+        with self._id_lock:
+            if self._next_id > self._last_id:
+                conn = open_connection(self.db_file)
+                try:
+                    self._next_id, self._last_id = reserve_ids(conn, self.id_block)
+                finally:
+                    conn.close()
+            new_id = self._next_id
+            self._next_id += 1
+            return new_id
+
+    def submit(self, timestamp, code, preset, image_path, status, target_session, image=None):
+        new_id = self._allocate_id()
+        record = {
+            "ID": new_id,
+            "Time": timestamp,
+            "Code": code,
+            "Type": preset,
+            "ImagePath": image_path,
+            "Status": status,
+            "TargetSession": target_session
+        }
+
+        self.start()
+        with self._cond:
+            self._submitted_seq += 1
+            self._pending.append((self._submitted_seq, record, image))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return record
+
+    def _write_image(self, path, image):
+        ok, encoded = cv2.imencode(os.path.splitext(path)[1] or '.jpg', image)
+        if not ok:
+            raise IOError(f"gagal encode gambar {path}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _sync_directories(self, paths):
+        if not self.fsync or not hasattr(os, 'O_DIRECTORY'):
+            return
+        for directory in {os.path.dirname(os.path.abspath(p)) for p in paths}:
+            try:
+                fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+    def _write_batch(self, batch):
+        #gambar ditulis lebih dulu supaya baris yang sudah commit selalu punya file;
+        #kalau gambar gagal ditulis, baris tetap disimpan dengan image_path kosong
+        image_paths = []
+        for _, record, image in batch:
+            if image is None or not record["ImagePath"]:
+                continue
+            try:
+                self._write_image(record["ImagePath"], image)
+                image_paths.append(record["ImagePath"])
+            except Exception as e:
+                print(f"[writer] Gagal menyimpan gambar {record['ImagePath']}: {e}")
+                record["ImagePath"] = ""
+                self.missing_images += 1
+        self._sync_directories(image_paths)
+
+        insert_records(self._connection(), [record for _, record, _ in batch])
+
+    def _dead_letter(self, batch, error):
+        #deteksi yang terus gagal disimpan ke file JSON lines supaya antrian di belakangnya tetap jalan
+        try:
+            with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                for _, record, _ in batch:
+                    f.write(json.dumps(dict(record, Error=str(error))) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"[writer] {len(batch)} deteksi dipindah ke {self.dead_letter_file}: {error}")
+        except Exception as e:
+            print(f"[writer] Gagal menulis {self.dead_letter_file}, {len(batch)} deteksi hilang: {e}")
+
+    def _write_isolated(self, batch):
+        written = []
+        for item in batch:
+            try:
+                self._write_batch([item])
+                written.append(item)
+            except Exception as e:
+                self._dead_letter([item], e)
+                with self._cond:
+                    self.failed += 1
+                    self.dead_lettered += 1
+        return written
+
+    def _take_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popleft())
+        self._in_flight = len(batch)
+        return batch
+
+    def _run(self):
+        attempts = 0
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if not self._pending:
+                    if not self._running:
+                        return
+                    continue
+                batch = self._take_batch()
+
+            last_seq = batch[-1][0]
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                attempts += 1
+                if attempts <= self.max_retries:
+                    print(f"[writer] Gagal menyimpan {len(batch)} deteksi, dicoba lagi ({attempts}/{self.max_retries}): {e}")
+                    with self._cond:
+                        self.failed += 1
+                        self._in_flight = 0
+                        self._pending.extendleft(reversed(batch))
+                        stopping = not self._running
+                    if stopping:
+                        return
+                    time.sleep(max(self.flush_interval, 0.5))
+                    continue
+
+                #batas retry habis: simpan satu per satu, hanya deteksi yang tetap gagal masuk dead-letter
+                batch = self._write_isolated(batch)
+
+            attempts = 0
+            with self._cond:
+                self._in_flight = 0
+                self._written_seq = last_seq
+                self.written += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+            if not batch:
+                continue
+            records = [record for _, record, _ in batch]
+            for callback in list(self._listeners):
+                try:
+                    callback(records)
+                except Exception as e:
+                    print(f"[writer] listener error: {e}")
+
+    def flush(self, timeout=10.0):
+        #tunggu sampai semua deteksi yang sudah disubmit tersimpan
+        if threading.current_thread() is self._thread:
+            return True
+
+        with self._cond:
+            target = self._submitted_seq
+            if self._written_seq >= target:
+                return True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._written_seq >= target or not self._thread or not self._thread.is_alive(),
+                timeout
+            ) and self._written_seq >= target
+
+    def close(self, timeout=10.0):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+
+        with self._cond:
+            if self._pending:
+                print(f"[writer] {len(self._pending)} deteksi belum tersimpan saat shutdown")
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def stats(self):
+        with self._cond:
+            return {
+                'write_pending': len(self._pending) + self._in_flight,
+                'write_written': self.written,
+                'write_batches': self.batches,
+                'write_failed': self.failed,
+                'write_dead_lettered': self.dead_lettered,
+                'write_missing_images': self.missing_images,
+            }
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DetectionWriter()
+            _writer.start()
+            set_pending_writes_hook(_writer.flush)
+            atexit.register(_writer.close)
+        return _writer
@@ -0,0 +1,139 @@
+import threading
+import time
+from config import (
+    PREVIEW_FPS, PREVIEW_QUALITY, PREVIEW_MIN_QUALITY, PREVIEW_MAX_FPS, PREVIEW_ACK_TIMEOUT
+)
+
+class _Client:
+    def __init__(self, sid, fps, quality):
+        self.sid = sid
+        self.fps = fps
+        self.target_quality = quality
+        self.quality = quality
+        self.enabled = True
+        self.in_flight = False
+        self.sent_at = 0.0
+        self.last_sent = 0.0
+        self.rtt = 0.0
+        self.bandwidth = 0.0
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.frames_acked = 0
+        self.frames_skipped = 0
+        self.connected_at = time.monotonic()
+
+class PreviewChannel:
+    #preview per browser: frame baru hanya dikirim setelah frame sebelumnya di-ack dan sesuai target FPS,
+    #client yang lambat dilewati (tidak diantrikan), kualitas JPEG turun/naik mengikuti waktu ack
+
+    def __init__(self, socketio, fps=PREVIEW_FPS, quality=PREVIEW_QUALITY,
+                 min_quality=PREVIEW_MIN_QUALITY, ack_timeout=PREVIEW_ACK_TIMEOUT):
+        self.socketio = socketio
+        self.default_fps = fps
+        self.default_quality = quality
+        self.min_quality = min_quality
+        self.ack_timeout = ack_timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def add(self, sid):
+        with self._lock:
+            self._clients[sid] = _Client(sid, self.default_fps, self.default_quality)
+
+    def remove(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def configure(self, sid, fps=None, quality=None, enabled=None):
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return False
+            if fps is not None:
+                client.fps = max(0.5, min(float(fps), PREVIEW_MAX_FPS))
+            if quality is not None:
+                client.target_quality = max(self.min_quality, min(int(quality), 95))
+                client.quality = client.target_quality
+            if enabled is not None:
+                #browser yang memakai /api/stream.mjpg mematikan frame Socket.IO
+                client.enabled = bool(enabled)
+            return True
+
+    def _ready_clients(self, now):
+        ready = []
+        with self._lock:
+            for client in self._clients.values():
+                if not client.enabled:
+                    continue
+                #ack yang hilang tidak boleh menghentikan stream selamanya
+                if client.in_flight and now - client.sent_at < self.ack_timeout:
+                    client.frames_skipped += 1
+                    continue
+                if now - client.last_sent < 1.0 / client.fps:
+                    client.frames_skipped += 1
+                    continue
+                client.in_flight = True
+                client.sent_at = now
+                ready.append((client.sid, client.quality))
+        return ready
+
+    def _on_ack(self, sid, size):
+        now = time.monotonic()
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None or not client.in_flight:
+                return
+            client.in_flight = False
+            client.frames_acked += 1
+
+            rtt = now - client.sent_at
+            client.rtt = rtt if client.rtt == 0 else client.rtt * 0.8 + rtt * 0.2
+            rate = size / max(rtt, 1e-3)
+            client.bandwidth = rate if client.bandwidth == 0 else client.bandwidth * 0.8 + rate * 0.2
+
+            interval = 1.0 / client.fps
+            if client.rtt > interval * 1.5:
+                client.quality = max(self.min_quality, client.quality - 10)
+            elif client.rtt < interval * 0.5:
+                client.quality = min(client.target_quality, client.quality + 5)
+
+    def _record_sent(self, sid, size, now):
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return
+            client.last_sent = now
+            client.bytes_sent += size
+            client.frames_sent += 1
+
+    def publish(self, frame, seq):
+        #frame = PreviewFrame, JPEG hanya di-encode untuk kualitas yang dibutuhkan client yang siap
+        now = time.monotonic()
+        ready = self._ready_clients(now)
+        if not ready:
+            return
+
+        for sid, quality in ready:
+            data = frame.jpeg(quality)
+            size = len(data)
+            self._record_sent(sid, size, now)
+            self.socketio.emit('frame', {'seq': seq, 'img': data, 'q': quality}, to=sid,
+                               callback=lambda *args, sid=sid, size=size: self._on_ack(sid, size))
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'sid': c.sid,
+                'enabled': c.enabled,
+                'fps': c.fps,
+                'quality': c.quality,
+                'target_quality': c.target_quality,
+                'rtt_ms': round(c.rtt * 1000, 1),
+                'bandwidth_kbps': round(c.bandwidth * 8 / 1000, 1),
+                'avg_kbps': round(c.bytes_sent * 8 / 1000 / max(now - c.connected_at, 1e-3), 1),
+                'bytes_sent': c.bytes_sent,
+                'frames_sent': c.frames_sent,
+                'frames_acked': c.frames_acked,
+                'frames_skipped': c.frames_skipped,
+            } for c in self._clients.values()]
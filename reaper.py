@@ -0,0 +1,125 @@
+import os
+import threading
+import atexit
+from config import DB_FILE, REAPER_BATCH_SIZE, REAPER_RETRY_INTERVAL, REAPER_MAX_ATTEMPTS
+from database import db_connection, set_tombstone_hook
+
+class ImageReaper:
+    #hapus file gambar yang tercatat di image_tombstones, tombstone baru dihapus setelah file hilang
+    #sehingga file yang belum sempat dihapus saat crash tetap dibersihkan setelah start berikutnya
+
+    def __init__(self, db_file=DB_FILE, batch_size=REAPER_BATCH_SIZE, retry_interval=REAPER_RETRY_INTERVAL,
+                 max_attempts=REAPER_MAX_ATTEMPTS):
+        self.db_file = db_file
+        self.batch_size = max(1, int(batch_size))
+        self.retry_interval = max(0.1, float(retry_interval))
+        self.max_attempts = max(1, int(max_attempts))
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.removed = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="ImageReaper", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _remove(self, image_path):
+        try:
+            os.remove(image_path)
+        except FileNotFoundError:
+            pass
+
+    def reap_once(self):
+        #satu batch; return (selesai, gagal)
+        with db_connection(self.db_file) as conn:
+            rows = conn.execute(
+                "SELECT id, image_path, attempts FROM image_tombstones WHERE attempts < ? ORDER BY id LIMIT ?",
+                (self.max_attempts, self.batch_size)
+            ).fetchall()
+
+        if not rows:
+            return 0, 0
+
+        done = []
+        failed = []
+        for tombstone_id, image_path, attempts in rows:
+            try:
+                self._remove(image_path)
+                done.append((tombstone_id,))
+            except OSError as e:
+                failed.append((str(e), tombstone_id))
+                if attempts + 1 >= self.max_attempts:
+                    print(f"[reaper] Menyerah menghapus {image_path} setelah {attempts + 1} percobaan: {e}")
+
+        with db_connection(self.db_file) as conn:
+            try:
+                conn.executemany("DELETE FROM image_tombstones WHERE id = ?", done)
+                conn.executemany("UPDATE image_tombstones SET attempts = attempts + 1, last_error = ? WHERE id = ?", failed)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        with self._lock:
+            self.removed += len(done)
+            self.failed += len(failed)
+        return len(done), len(failed)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                done, failed = self.reap_once()
+            except Exception as e:
+                print(f"[reaper] Error: {e}")
+                done, failed = 0, 1
+
+            #batch penuh tanpa gagal: lanjut tanpa menunggu
+            if done >= self.batch_size and not failed:
+                continue
+            self._wake.wait(self.retry_interval)
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def pending(self):
+        try:
+            with db_connection(self.db_file) as conn:
+                return conn.execute("SELECT COUNT(*) FROM image_tombstones WHERE attempts < ?",
+                                    (self.max_attempts,)).fetchone()[0]
+        except Exception:
+            return 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'reap_removed': self.removed,
+                'reap_failed': self.failed,
+            }
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+def get_reaper():
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = ImageReaper()
+            set_tombstone_hook(_reaper.wake)
+            _reaper.start()
+            atexit.register(_reaper.close)
+        return _reaper
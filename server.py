@@ -0,0 +1,36 @@
+from config import (
+    APP_NAME, SERVER_MODE, SERVER_HOST, SERVER_PORT, SERVER_THREADS, SERVER_CONNECTION_LIMIT,
+    SERVER_CHANNEL_TIMEOUT
+)
+
+def _serve_waitress(app, socketio, host, port):
+    try:
+        from waitress import serve
+    except ImportError:
+        print("[server] waitress belum terpasang (pip install waitress), memakai server Werkzeug")
+        return False
+
+    #kamera, OCR, writer dan export tetap di thread sendiri; waitress hanya melayani request dengan
+    #thread pool tetap, jadi download/export yang lama tidak menahan request lain di luar batas pool.
+    #waitress tidak mendukung upgrade WebSocket: Socket.IO (data, event) berjalan lewat long-polling,
+    #preview kamera di browser memakai /api/stream.mjpg supaya tidak satu request per frame
+    socketio.server.eio.allow_upgrades = False
+    app.config['PREVIEW_TRANSPORT'] = 'mjpeg'
+
+    print(f"[server] Mode production (waitress), {SERVER_THREADS} thread, http://{host}:{port}")
+    serve(
+        app,
+        host=host,
+        port=port,
+        threads=SERVER_THREADS,
+        connection_limit=SERVER_CONNECTION_LIMIT,
+        channel_timeout=SERVER_CHANNEL_TIMEOUT,
+        ident=APP_NAME,
+    )
+    return True
+
+def run_server(app, socketio, host=SERVER_HOST, port=SERVER_PORT, mode=SERVER_MODE):
+    if mode == "production" and _serve_waitress(app, socketio, host, port):
+        return
+
+    socketio.run(app, host=host, port=port, debug=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,123 @@
+import threading
+from datetime import datetime
+from database import db_connection, day_bounds, flush_pending_writes
+
+class DetectionStats:
+    #counter OK / Not OK per (preset, target_session) untuk satu hari, dimuat sekali lewat GROUP BY
+    #lalu ditambah setiap ada deteksi baru; dimuat ulang setelah hapus atau ganti hari
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._counts = {}
+        self._max_id = 0
+        self._generation = 0
+        self._loading = 0
+        self._backlog = []
+
+    def _query(self, day):
+        flush_pending_writes()
+        day_start, day_end = day_bounds(day)
+        counts = {}
+        max_id = 0
+
+        try:
+            with db_connection() as conn:
+                rows = conn.execute(
+                    "SELECT preset, target_session, code, status, COUNT(*), MAX(id) FROM detected_codes "
+                    "WHERE timestamp >= ? AND timestamp < ? GROUP BY preset, target_session, code, status",
+                    (day_start, day_end)
+                ).fetchall()
+        except Exception as e:
+            print(f"[stats] Error memuat statistik: {e}")
+            rows = []
+
+        for preset, target_session, code, status, count, row_max_id in rows:
+            self._add(counts, preset, target_session or code, status, count)
+            max_id = max(max_id, row_max_id or 0)
+        return counts, max_id
+
+    def _add(self, counts, preset, target_session, status, count):
+        entry = counts.get((preset, target_session))
+        if entry is None:
+            entry = counts[(preset, target_session)] = [0, 0, 0]
+        entry[0] += count
+        if status == 'Not OK':
+            entry[2] += count
+        elif status == 'OK' or not status:
+            entry[1] += count
+
+    def _ensure_day(self, day):
+        #flush dan query dijalankan di luar lock: listener writer (app._on_records_written) memanggil summary,
+        #kalau lock dipegang selama flush, writer dan flush saling menunggu sampai timeout
+        while True:
+            with self._lock:
+                if self._day == day:
+                    return
+                generation = self._generation
+                self._loading += 1
+
+            try:
+                counts, max_id = self._query(day)
+            finally:
+                with self._lock:
+                    self._loading -= 1
+                    backlog = self._backlog
+                    if not self._loading:
+                        self._backlog = []
+
+            with self._lock:
+                #invalidate() selama query (misalnya setelah hapus): hasil bisa berisi baris yang sudah dihapus
+                if generation != self._generation:
+                    continue
+                #record yang masuk lewat add_records selama query berjalan
+                day_key = day.strftime("%Y-%m-%d")
+                for rec in backlog:
+                    if (rec.get('ID') or 0) > max_id and str(rec.get('Time', '')).startswith(day_key):
+                        self._add(counts, rec.get('Type'), rec.get('TargetSession') or rec.get('Code'), rec.get('Status'), 1)
+                        max_id = max(max_id, rec.get('ID') or 0)
+                self._day = day
+                self._counts = counts
+                self._max_id = max_id
+                return
+
+    def add_records(self, records):
+        with self._lock:
+            if self._loading:
+                self._backlog.extend(records)
+            if self._day is None:
+                return
+            for rec in records:
+                #record yang sudah ikut terhitung saat load tidak dihitung dua kali
+                if (rec.get('ID') or 0) <= self._max_id:
+                    continue
+                if not str(rec.get('Time', '')).startswith(self._day.strftime("%Y-%m-%d")):
+                    continue
+                self._add(self._counts, rec.get('Type'), rec.get('TargetSession') or rec.get('Code'), rec.get('Status'), 1)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._day = None
+            self._counts = {}
+            self._max_id = 0
+
+    def summary(self, day=None, preset=None, target_session=None):
+        if day is None:
+            day = datetime.now().date()
+
+        self._ensure_day(day)
+        total = ok = not_ok = 0
+        with self._lock:
+            for (rec_preset, rec_session), (count, count_ok, count_not_ok) in self._counts.items():
+                if preset is not None and rec_preset != preset:
+                    continue
+                if target_session is not None and rec_session != target_session:
+                    continue
+                total += count
+                ok += count_ok
+                not_ok += count_not_ok
+
+        return {'total': total, 'ok': ok, 'not_ok': not_ok}
+
+DETECTION_STATS = DetectionStats()
@@ -0,0 +1,95 @@
+import threading
+import time
+from config import STREAM_MAX_FPS, STREAM_KEEPALIVE, STREAM_MAX_CLIENTS, PREVIEW_QUALITY
+
+class _MjpegStream:
+    def __init__(self, frames, on_close):
+        self._frames = frames
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._frames)
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        self._frames.close()
+        if on_close is not None:
+            on_close()
+
+class FrameHub:
+    #frame preview terakhir untuk semua viewer HTTP: JPEG di-encode sekali per frame (cache di PreviewFrame),
+    #viewer yang lambat langsung mendapat frame terbaru (frame di antaranya dilewati)
+
+    BOUNDARY = "frame"
+
+    def __init__(self, max_streams=STREAM_MAX_CLIENTS):
+        self._cond = threading.Condition()
+        self.max_streams = max(1, int(max_streams))
+        self.streams = 0
+        self._frame = None
+        self._seq = 0
+        self._updated = 0.0
+        #pembeda ETag antar restart, karena seq mulai lagi dari 1
+        self.epoch = int(time.time() * 1000)
+
+    def publish(self, frame):
+        with self._cond:
+            self._seq += 1
+            self._frame = frame
+            self._updated = time.time()
+            self._cond.notify_all()
+            return self._seq
+
+    def latest(self):
+        #(PreviewFrame, seq, waktu update) atau (None, 0, 0.0) kalau belum ada frame
+        with self._cond:
+            return self._frame, self._seq, self._updated
+
+    def wait_next(self, after_seq, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            return self._frame, self._seq
+
+    def open_stream(self):
+        #satu slot per stream MJPEG yang terbuka, False kalau batas sudah penuh
+        with self._cond:
+            if self.streams >= self.max_streams:
+                return False
+            self.streams += 1
+            return True
+
+    def _close_stream(self):
+        with self._cond:
+            self.streams = max(0, self.streams - 1)
+
+    def mjpeg(self, max_fps=STREAM_MAX_FPS, quality=PREVIEW_QUALITY):
+        #dipanggil setelah open_stream() berhasil; slot dilepas saat server menutup response (viewer putus),
+        #juga kalau generator belum sempat mulai
+        return _MjpegStream(self._mjpeg_frames(max_fps, quality), self._close_stream)
+
+    def _mjpeg_frames(self, max_fps, quality):
+        interval = 1.0 / max(0.5, min(float(max_fps), STREAM_MAX_FPS))
+        seq = 0
+        next_at = 0.0
+        while True:
+            #tanpa frame baru (kamera berhenti) frame terakhir dikirim ulang tiap STREAM_KEEPALIVE detik,
+            #supaya viewer yang sudah putus terdeteksi saat menulis
+            frame, new_seq = self.wait_next(seq, STREAM_KEEPALIVE)
+            if frame is None:
+                continue
+            seq = new_seq
+            jpeg = frame.jpeg(quality)
+
+            yield (
+                b"--" + self.BOUNDARY.encode() + b"\r\n"
+                b"Content-Type: image/jpeg\r\n"
+                b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n"
+            )
+
+            now = time.monotonic()
+            if next_at > now:
+                time.sleep(next_at - now)
+            next_at = max(now, next_at) + interval
@@ -0,0 +1,78 @@
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import correction
+from matcher import DinMatcher
+
+#bacaan diambil dari nama file di dataset_try (LN0_250A.png -> "LN0 250A"), hasil acuan di golden_correction.json
+#direkam dari implementasi lama di ocr.py/utils.py sebelum koreksi dipindah ke correction.py
+DATASET_DIR = os.path.join(ROOT, 'dataset_try')
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_correction.json')
+
+_READING_NAME = re.compile(r'^(?:LBN|LN\d|\d+LN\d)')
+
+#kesalahan baca OCR yang umum pada label
+_VARIANTS = [
+    lambda s: s,
+    lambda s: s.replace(' ', ''),
+    lambda s: s.lower(),
+    lambda s: s.replace('0', 'O'),
+    lambda s: s.replace('1', 'I'),
+    lambda s: s.replace('5', 'S').replace('8', 'B'),
+    lambda s: s.replace('L', '1', 1).replace('N', 'H', 1),
+    lambda s: ' '.join(s.replace(' ', '')),
+    lambda s: s if s.endswith('ISS') else s + ' I55',
+]
+
+def dataset_readings():
+    readings = set()
+    for _, _, files in os.walk(DATASET_DIR):
+        for name in files:
+            stem = os.path.splitext(name)[0]
+            if _READING_NAME.match(stem):
+                readings.add(stem.replace('_', ' '))
+    return sorted(readings)
+
+def dataset_inputs():
+    inputs = set()
+    for reading in dataset_readings():
+        inputs.update(variant(reading) for variant in _VARIANTS)
+    return sorted(inputs)
+
+def catalog_matcher():
+    return DinMatcher(["Select Label . . ."] + dataset_readings())
+
+def outputs(text, matcher):
+    match, score = matcher.match(correction.correct("DIN", text).replace(' ', '').upper())
+    return {
+        'din': correction.correct("DIN", text),
+        'jis': correction.correct("JIS", text),
+        'normalize': correction.normalize_din_code(text),
+        'fix_din': correction.fix_common_ocr_errors_din(text),
+        'fix_jis': correction.fix_common_ocr_errors_jis(text),
+        'type': correction.detect_code_type(text),
+        'match': [match, round(score, 6)],
+    }
+
+def test_dataset_has_readings():
+    assert len(dataset_readings()) > 100
+
+def test_correction_matches_golden(monkeypatch):
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        golden = json.load(f)
+
+    matcher = catalog_matcher()
+    #detect_code_type memakai katalog dari type.db, diganti katalog dataset agar hasilnya tetap
+    monkeypatch.setattr(correction, 'DIN_MATCHER', matcher)
+
+    inputs = dataset_inputs()
+    assert sorted(golden) == inputs
+
+    actual = {text: outputs(text, matcher) for text in inputs}
+    mismatches = [(text, golden[text], actual[text]) for text in inputs if actual[text] != golden[text]]
+    assert not mismatches, mismatches[:5]
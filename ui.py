@@ -18,6 +18,7 @@ from config import (
 from datetime import datetime
 from ui_setting import create_setting_dialog
 from ui_export import create_export_dialog
+from stats import DETECTION_STATS
 import os
 import subprocess
 import platform
@@ -710,7 +711,7 @@ class MainWindow(QMainWindow):
 
     def _update_footer_stats(self, ok_count=None):
         if self.logic:
-            actual = len(self.logic.detected_codes)
+            actual = DETECTION_STATS.summary(self.logic.current_date)['total']
         else:
             actual = 0
         self.ft_actual_label.setText(str(actual))
@@ -888,7 +889,7 @@ class MainWindow(QMainWindow):
             while self.code_tree.topLevelItemCount() > 0:
                 self.code_tree.takeTopLevelItem(0)
 
-            self.logic.detected_codes = load_existing_data(self.logic.current_date)
+            self.logic.set_detected_codes(load_existing_data(self.logic.current_date))
 
             QTimer.singleShot(100, lambda: self.update_code_display())
 
@@ -1006,12 +1007,13 @@ class MainWindow(QMainWindow):
         if not is_running:
             self.video_label.setText("CAMERA STOP")
 
-    def update_video_frame(self, pil_image):
+    def update_video_frame(self, frame):
         if not self.video_label.size().isValid():
             return
 
-        qimage = QImage(pil_image.tobytes(), pil_image.width, pil_image.height,
-                        pil_image.width * 3, QImage.Format_RGB888)
+        #QImage langsung membaca buffer numpy milik PreviewFrame, tanpa salinan tobytes()
+        qimage = QImage(frame.rgb.data, frame.width, frame.height,
+                        frame.bytes_per_line, QImage.Format_RGB888)
 
         pixmap = QPixmap.fromImage(qimage)
         scaled_pixmap = pixmap.scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
@@ -1053,18 +1055,12 @@ class MainWindow(QMainWindow):
             self.update_statistics_display(". . .", 0, 0, 0)
             return
 
-        displayed_count = 0
-        ok_count = 0
-        not_ok_count = 0
-
         for i, record in enumerate(reversed(self.logic.detected_codes)):
             target_session = record.get('TargetSession', record['Code'])
 
             if target_session != selected_session:
                 continue
 
-            displayed_count += 1
-
             time_str = record['Time'][11:19]
             code_str = f"{record['Code']} ({record['Type']})"
             status_str = record.get('Status', 'OK')
@@ -1074,15 +1070,13 @@ class MainWindow(QMainWindow):
             item = QTreeWidgetItem([time_str, code_str, status_str, image_path, str(record_id)])
             self.code_tree.addTopLevelItem(item)
 
-            if status_str == "OK":
-                ok_count += 1
-            elif status_str == "Not OK":
-                not_ok_count += 1
+            if status_str == "Not OK":
                 for col in range(item.columnCount()):
                     item.setBackground(col, QColor(255, 0, 0))
                     item.setForeground(col, QColor(255, 255, 255))
 
-        self.update_statistics_display(selected_session, displayed_count, ok_count, not_ok_count)
+        counts = DETECTION_STATS.summary(self.logic.current_date, target_session=selected_session)
+        self.update_statistics_display(selected_session, counts['total'], counts['ok'], counts['not_ok'])
 
     def view_selected_image(self, item, column):
         import sys
@@ -1303,6 +1297,7 @@ class MainWindow(QMainWindow):
             end_date = None
             sql_filter = ""
             date_range_desc = ""
+            export_range = None
 
             try:
                 current_time = datetime.now()
@@ -1354,6 +1349,7 @@ class MainWindow(QMainWindow):
                     else:
                         date_range_desc = f"{start_date.strftime('%d-%m-%Y')} s/d {end_date.strftime('%d-%m-%Y')}"
                     sql_filter = f"WHERE timestamp BETWEEN '{start_date_str_db}' AND '{end_date_str_db}'"
+                    export_range = (start_date_str_db, end_date_str_db)
 
                 selected_export_preset = dialog.export_preset_combo.currentText()
                 if selected_export_preset == "Preset":
@@ -1408,7 +1404,8 @@ class MainWindow(QMainWindow):
                         dialog.export_label_type_combo.currentText() if dialog.export_label_filter_enabled.isChecked() else "",
                         selected_export_preset,
                         self.qty_plan,
-                        show_qty_plan
+                        show_qty_plan,
+                        export_range
                     ),
                     daemon=True
                 ).start()
@@ -1430,7 +1427,7 @@ class MainWindow(QMainWindow):
                 pass
             self.btn_export.setEnabled(True)
 
-    def _execute_export_thread(self, sql_filter, date_range_desc, export_label="", current_preset="", qty_plan=0, show_qty_plan=True):
+    def _execute_export_thread(self, sql_filter, date_range_desc, export_label="", current_preset="", qty_plan=0, show_qty_plan=True, date_range=None):
         from export import execute_export
 
         if not self.logic:
@@ -1440,7 +1437,7 @@ class MainWindow(QMainWindow):
         def progress_callback(current, total, message):
             self.export_progress_signal.emit(message, f"{current}")
 
-        result = execute_export(sql_filter, date_range_desc, export_label, current_preset, progress_callback, qty_plan=qty_plan, show_qty_plan=show_qty_plan)
+        result = execute_export(sql_filter, date_range_desc, export_label, current_preset, progress_callback, qty_plan=qty_plan, show_qty_plan=show_qty_plan, date_range=date_range)
 
         self.export_result_signal.emit(result)
 
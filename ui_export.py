@@ -8,13 +8,13 @@ from datetime import datetime, timedelta, time as py_time
 from config import MONTHS, MONTH_MAP
 
 def create_export_dialog(parent, logic, preset_combo, jis_type_combo):
-    from database import get_detection_count
+    from partition import total_detection_count
 
     if not logic:
         QMessageBox.critical(parent, "Error", "Logic belum diinisialisasi. Coba mulai dan hentikan deteksi kamera sekali.")
         return None
 
-    count = get_detection_count(logic.db_file if hasattr(logic, 'db_file') else None)
+    count = total_detection_count()
 
     if count == 0:
         QMessageBox.information(parent, "Info", "Tidak ada data !")
@@ -1,5 +1,4 @@
 import os
-import re
 import numpy as np
 import cv2
 from datetime import datetime
@@ -19,167 +18,6 @@ def apply_edge_detection(frame):
     edges_bgr[edges_dilated > 0] = [255, 255, 255]
     return edges_bgr
 
-def fix_common_ocr_errors_jis(text):
-    text = text.strip().upper()
-    text = re.sub(r'[^A-Z0-9()]', '', text)
-
-    char_to_digit = {
-        "O": "0", "Q": "0", "D": "0", "U": "0", "C": "0",  #mirip angka 0
-        "I": "1", "L": "1", "J": "1",                      #mirip angka 1
-        "Z": "2", "E": "3", "A": "4", "H": "4",            #mirip angka 2,3,4
-        "S": "5", "G": "6", "T": "7", "Y": "7",            #mirip angka 5,6,7
-        "B": "8", "P": "9", "R": "9"                       #mirip angka 8,9
-    }
-
-    digit_to_char = {
-        "0": "D", "1": "L", "2": "Z", "3": "B", "4": "A", "5": "S",
-        "6": "G", "7": "T", "8": "B", "9": "R", "D" : "G"
-    }
-
-    match = re.search(r'(\d+|[A-Z]+)(\d+|[A-Z])(\d+|[A-Z]+)([L|R|1|0|4|D|I]?)(\(S\)|5\)|S)?$', text)
-
-    if match:
-        capacity = match.group(1)
-        type_char = match.group(2)
-        size = match.group(3)
-        terminal = match.group(4)
-        option = match.group(5)
-
-        new_capacity = "".join([char_to_digit.get(c, c) for c in capacity])
-
-        if type_char.isdigit():
-            new_type = digit_to_char.get(type_char, type_char)
-        else:
-            new_type = type_char
-
-        if new_type in ['O', 'Q', 'G', '0', 'U', 'C']: new_type = 'D'
-        if new_type in ['8', '3']: new_type = 'B'
-        if new_type in ['4']: new_type = 'A'
-
-        size_digit_only = ''
-        size_extra_terminal = ''
-        for idx_c, c in enumerate(size):
-            if c.isdigit():
-                size_digit_only += c
-            elif c in char_to_digit:
-                size_digit_only += char_to_digit[c]
-            elif c in ['L', 'R'] and idx_c >= len(size) - 1 and not terminal:
-                size_extra_terminal = c
-            else:
-                size_digit_only += c
-        new_size = size_digit_only
-        if size_extra_terminal and not terminal:
-            terminal = size_extra_terminal
-
-        if terminal:
-            if terminal in ['1', 'I', 'J', '4']:
-                terminal = 'L'  #karakter mirip L
-            elif terminal in ['0', 'Q', 'D', 'O']:
-                terminal = 'R'  #karakter mirip R
-
-        if option:
-            option = '(S)'
-
-        text_fixed = f"{new_capacity}{new_type}{new_size}{terminal}{option if option else ''}"
-        return text_fixed.strip().upper()
-
-    for char, digit in char_to_digit.items():
-        text = text.replace(char, digit)
-
-    text = text.replace('5)', '(S)').replace('(5)', '(S)')
-    return text.strip().upper()
-
-def fix_common_ocr_errors_din(text):
-    text = text.strip().upper()
-    text = re.sub(r'[^A-Z0-9\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-
-    text = re.sub(r'^(LBN)(\d)', r'\1 \2', text)
-    text = re.sub(r'^(LN\d)(\d)', r'\1 \2', text)
-    text = re.sub(r'([A-Z0-9])(ISS)$', r'\1 \2', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-
-    tokens = text.split()
-
-    if len(tokens) == 0:
-        return text
-
-    corrected_tokens = []
-
-    for i, token in enumerate(tokens):
-        if i == 0:
-            corrected = ""
-            for j, char in enumerate(token):
-                if j == 0:
-                    if char in ['1', 'I', 'l']:
-                        corrected += 'L'
-                    else:
-                        corrected += char
-                elif j == 1:
-                    if char == '8':
-                        corrected += 'B'
-                    elif char in ['H', 'M', 'I1']:
-                        corrected += 'N'
-                    else:
-                        corrected += char
-                elif j == 2:
-                    prefix_so_far = corrected
-                    if prefix_so_far == 'LB':
-                        if char in ['H', 'M']:
-                            corrected += 'N'
-                        else:
-                            corrected += char
-                    else:
-                        digit_map = {'O': '0', 'Q': '0', 'I': '1', 'L': '1', 'Z': '2', 'S': '5', 'G': '6', 'B': '8'}
-                        corrected += digit_map.get(char, char)
-                else:
-                    corrected += char
-
-            corrected_tokens.append(corrected)
-
-        elif i == 1:
-            digit_map = {'O': '0', 'Q': '0', 'I': '1', 'L': '1', 'Z': '2', 'S': '5', 'G': '6', 'B': '8'}
-
-            corrected = ""
-            for j, char in enumerate(token):
-                is_last = (j == len(token) - 1)
-                if char.isdigit():
-                    corrected += char
-                elif is_last and char.isalpha():
-                    if char in ['4']:
-                        corrected += 'A'
-                    else:
-                        corrected += char
-                elif char in digit_map:
-                    corrected += digit_map[char]
-                else:
-                    corrected += char
-
-            corrected_tokens.append(corrected)
-
-        elif i == 2:
-            corrected = token
-            token_normalized = token.replace('5', 'S').replace('1', 'I').replace('0', 'O')
-            if token_normalized == 'ISS' or token in ['I55', 'IS5', 'I5S', '155', 'ISS']:
-                corrected = 'ISS'
-
-            corrected_tokens.append(corrected)
-
-        else:
-            corrected_tokens.append(token)
-
-    result = ' '.join(corrected_tokens)
-    result = re.sub(r'\s+', ' ', result).strip()
-    return result
-
-def fix_common_ocr_errors(text, preset):
-    if preset == "JIS":
-        return fix_common_ocr_errors_jis(text)
-    elif preset == "DIN":
-        return fix_common_ocr_errors_din(text)
-    else:
-        return fix_common_ocr_errors_jis(text)
-
 def convert_frame_to_binary(frame):
     return apply_edge_detection(frame)
 